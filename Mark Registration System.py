@@ -1,9 +1,10 @@
 import tkinter as tk
 from tkinter import messagebox, ttk
-import sqlite3
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 
+from marks_db import MarksDatabase
+
 
 class MarkRegistrationSystem:
     def __init__(self, root):
@@ -37,42 +38,11 @@ class MarkRegistrationSystem:
         self.show_home()
 
     def setup_database(self):
+        # Same data layer and migrations as mark_registration_system_1.py, so
+        # both work on the normalized schema
+        self.db = MarksDatabase()
         try:
-            conn = sqlite3.connect('marks.db')
-            cursor = conn.cursor()
-
-            # Create table if not exists
-            cursor.execute('''
-            CREATE TABLE IF NOT EXISTS marks (
-                student_id TEXT PRIMARY KEY,
-                student_name TEXT,
-                module_code TEXT,
-                module_name TEXT,
-                date_of_entry TEXT,
-                coursework_1_mark INTEGER,
-                coursework_2_mark INTEGER,
-                coursework_3_mark INTEGER,
-                gender TEXT
-            )
-            ''')
-
-            # Check existing columns
-            cursor.execute("PRAGMA table_info(marks);")
-            existing_columns = [row[1] for row in cursor.fetchall()]
-
-            # Ensure coursework_1_mark, coursework_2_mark, and coursework_3_mark exist
-            missing_columns = []
-            for col in ["coursework_1_mark", "coursework_2_mark", "coursework_3_mark"]:
-                if col not in existing_columns:
-                    missing_columns.append(col)
-
-            # Add missing columns if needed
-            for col in missing_columns:
-                cursor.execute(f"ALTER TABLE marks ADD COLUMN {col} INTEGER;")
-                print(f"Added missing column: {col}")
-
-            conn.commit()
-            conn.close()
+            self.db.migrate()
             print("Database setup completed successfully.")
 
         except Exception as e:
@@ -124,16 +94,7 @@ class MarkRegistrationSystem:
             return
 
         try:
-            conn = sqlite3.connect('marks.db')
-            cursor = conn.cursor()
-
-            cursor.execute('''
-            INSERT INTO program_info (num_students, num_modules)
-            VALUES (?, ?)
-            ''', (self.num_students.get(), self.num_modules.get()))
-
-            conn.commit()
-            conn.close()
+            self.db.save_program_info(self.num_students.get(), self.num_modules.get())
 
             messagebox.showinfo("Success", "Records saved successfully!")
             self.show_input_marks()
@@ -200,24 +161,13 @@ class MarkRegistrationSystem:
             return
 
         try:
-            conn = sqlite3.connect('marks.db')
-            cursor = conn.cursor()
-
-            cursor.execute('''
-            INSERT INTO marks (
-                module_code, module_name, coursework_1_mark, coursework_2_mark,
-                coursework_3_mark, student_id, student_name, gender, date_of_entry
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
+            self.db.insert_mark(
                 self.module_code.get(), self.module_name.get(),
                 self.coursework_1_mark.get(), self.coursework_2_mark.get(),
                 self.coursework_3_mark.get(), self.student_id.get(),
                 self.student_name.get(), self.gender.get(),
                 self.date_of_entry.get()
-            ))
-
-            conn.commit()
-            conn.close()
+            )
 
             messagebox.showinfo("Success", "Marks submitted successfully!")
 
@@ -274,25 +224,15 @@ class MarkRegistrationSystem:
             return
 
         try:
-            conn = sqlite3.connect('marks.db')
-            cursor = conn.cursor()
-
-            cursor.execute('''
-            SELECT student_id, student_name, coursework_1_mark, coursework_2_mark,
-                   coursework_3_mark
-            FROM marks
-            WHERE LOWER(module_code) = ?
-            ''', (search_term,))  # Search by module_code, not student_name
-
-            results = cursor.fetchall()
-            conn.close()
+            # Search by module_code, not student_name
+            results = self.db.marks_for_module(search_term)
 
             for item in self.tree.get_children():
                 self.tree.delete(item)
 
             if results:
                 for row in results:
-                    total = sum(row[2:5])  # Sum of coursework marks
+                    total = sum(mark or 0 for mark in row[2:5])  # Sum of coursework marks
                     self.tree.insert("", tk.END, values=(*row, total))
                 self.marks_viewed = True
                 self.next_button.config(state=tk.NORMAL)  # Enable "Next" button
@@ -351,22 +291,18 @@ class MarkRegistrationSystem:
             return
 
         try:
-            conn = sqlite3.connect('marks.db')
-            cursor = conn.cursor()
-
-            cursor.execute('''
-            SELECT * FROM marks WHERE student_id = ?
-            ''', (student_id,))
-
-            result = cursor.fetchone()
-            conn.close()
+            # A student has one row per module: the one in the form, else the first
+            results = self.db.marks_for_student(student_id)
+            module_code = self.module_code.get().strip().lower()
+            result = next((row for row in results if row[0].lower() == module_code),
+                          results[0] if results else None)
 
             if result:
-                self.module_code.set(result[1])
-                self.date_of_entry.set(result[9])
-                self.coursework_1_mark.set(result[3])
-                self.coursework_2_mark.set(result[4])
-                self.coursework_3_mark.set(result[5])
+                self.module_code.set(result[0])
+                self.date_of_entry.set(result[5])
+                self.coursework_1_mark.set(result[2])
+                self.coursework_2_mark.set(result[3])
+                self.coursework_3_mark.set(result[4])
                 messagebox.showinfo("Success", "Student record found and loaded.")
             else:
                 messagebox.showinfo("Not Found", "No matching record found.")
@@ -381,29 +317,19 @@ class MarkRegistrationSystem:
             return
 
         try:
-            conn = sqlite3.connect('marks.db')
-            cursor = conn.cursor()
-
-            cursor.execute('''
-            UPDATE marks
-            SET module_code = ?, date_of_entry = ?,
-                coursework_1_mark = ?, coursework_2_mark = ?, coursework_3_mark = ?
-            WHERE student_id = ?
-            ''', (
-                self.module_code.get(), self.date_of_entry.get(),
+            # Marks are keyed on the student and the module
+            updated = self.db.update_mark(
+                student_id, self.module_code.get().strip(), self.date_of_entry.get(),
                 self.coursework_1_mark.get(), self.coursework_2_mark.get(),
-                self.coursework_3_mark.get(), student_id
-            ))
+                self.coursework_3_mark.get()
+            )
 
-            if cursor.rowcount > 0:
-                conn.commit()
+            if updated > 0:
                 self.marks_updated = True
                 messagebox.showinfo("Success", "Marks updated successfully!")
                 self.next_button.config(state=tk.NORMAL)  # Enable Next button
             else:
-                messagebox.showwarning("Not Found", "Student ID not found in the database.")
-
-            conn.close()
+                messagebox.showwarning("Not Found", "No marks found for this student and module.")
 
         except Exception as e:
             messagebox.showerror("Error", f"Failed to update marks: {e}")
@@ -415,23 +341,17 @@ class MarkRegistrationSystem:
             return
 
         try:
-            conn = sqlite3.connect('marks.db')
-            cursor = conn.cursor()
-
-            cursor.execute('''
-                DELETE FROM marks WHERE student_id = ?
-                ''', (student_id,))
+            # Every module of the student, as this page always did
+            module_codes = [row[0] for row in self.db.marks_for_student(student_id)]
+            deleted = self.db.delete_marks([(student_id, module_code) for module_code in module_codes])
 
-            if cursor.rowcount > 0:
-                conn.commit()
+            if deleted > 0:
                 messagebox.showinfo("Success", f"Student ID {student_id} deleted successfully!")
                 # If deleting, disable the next button as there's nothing to visualize after delete
                 self.next_button.config(state=tk.DISABLED)
             else:
                 messagebox.showwarning("Not Found", "Student ID not found in the database.")
 
-            conn.close()
-
         except Exception as e:
             messagebox.showerror("Error", f"Failed to delete record: {e}")
 
@@ -462,26 +382,16 @@ class MarkRegistrationSystem:
 
         def get_module_data(module_code):
             try:
-                conn = sqlite3.connect('marks.db')
-                cursor = conn.cursor()
-
-                cursor.execute('''
-                    SELECT student_name, coursework_1_mark, coursework_2_mark, coursework_3_mark
-                    FROM marks
-                    WHERE module_code = ?
-                    ''', (module_code,))
-
-                results = cursor.fetchall()
-                conn.close()
+                results = self.db.marks_for_module(module_code)
 
                 if not results:
                     return None
 
                 return [{
-                    'Student Name': row[0],
-                    'Coursework 1 Mark': row[1],
-                    'Coursework 2 Mark': row[2],
-                    'Coursework 3 Mark': row[3]
+                    'Student Name': row[1],
+                    'Coursework 1 Mark': row[2] or 0,
+                    'Coursework 2 Mark': row[3] or 0,
+                    'Coursework 3 Mark': row[4] or 0
                 } for row in results]
 
             except Exception as e:
@@ -1,6 +1,6 @@
-import sqlite3
 import tkinter as tk
-from tkinter import messagebox
+
+from marks_db import MarksDatabase
 
 
 class MarkRegistrationSystem:
@@ -9,42 +9,12 @@ class MarkRegistrationSystem:
         self.setup_database()  # Now correctly calling the method inside the class
 
     def setup_database(self):
+        # Uses the same versioned migrations as the main app, so a database
+        # touched by this script has the app's id-keyed marks schema
         try:
-            conn = sqlite3.connect('marks.db')
-            cursor = conn.cursor()
-
-            # Create table if not exists
-            cursor.execute('''
-            CREATE TABLE IF NOT EXISTS marks (
-                student_id TEXT PRIMARY KEY,
-                student_name TEXT,
-                module_code TEXT,
-                module_name TEXT,
-                date_of_entry TEXT,
-                coursework_1_mark INTEGER,
-                coursework_2_mark INTEGER,
-                coursework_3_mark INTEGER,
-                gender TEXT
-            )
-            ''')
-
-            # Check existing columns
-            cursor.execute("PRAGMA table_info(marks);")
-            existing_columns = [row[1] for row in cursor.fetchall()]
-
-            # Ensure coursework_1_mark, coursework_2_mark, and coursework_3_mark exist
-            missing_columns = []
-            for col in ["coursework_1_mark", "coursework_2_mark", "coursework_3_mark"]:
-                if col not in existing_columns:
-                    missing_columns.append(col)
-
-            # Add missing columns if needed
-            for col in missing_columns:
-                cursor.execute(f"ALTER TABLE marks ADD COLUMN {col} INTEGER;")
-                print(f"Added missing column: {col}")
-
-            conn.commit()
-            conn.close()
+            db = MarksDatabase()
+            db.migrate()
+            db.close()
             print("Database setup completed successfully.")
 
         except Exception as e:
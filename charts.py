@@ -0,0 +1,114 @@
+from matplotlib.figure import Figure
+
+GRAPH_TYPES = ('bar', 'line', 'scatter', 'pie')
+PIE_COLOURS = ['#2ecc71', '#3498db', '#f1c40f', '#e67e22', '#e74c3c']
+
+
+class ModuleChart:
+    # One figure for the lifetime of the visualisation page. Each graph type
+    # gets its own axes, built the first time it is shown for a dataset;
+    # switching type only toggles which axes is visible, and loading another
+    # module updates the existing artists where the shape allows it
+    def __init__(self, figure=None):
+        self.figure = figure or Figure(figsize=(10, 6), dpi=100)
+        # Fixed margins leave room for the rotated student names without
+        # paying for tight_layout on every switch
+        self.figure.subplots_adjust(left=0.08, right=0.97, top=0.92, bottom=0.25)
+        self.axes = {}
+        self.artists = {}
+        self.data = None
+        self.graph_type = None
+        self._drawn_for = {}
+
+    def set_data(self, chart_data):
+        self.data = chart_data
+
+    def show(self, graph_type):
+        ax = self.axes.get(graph_type)
+        if ax is None:
+            ax = self.axes[graph_type] = self.figure.add_subplot(111, label=graph_type)
+
+        if self._drawn_for.get(graph_type) is not self.data:
+            getattr(self, f'_draw_{graph_type}')(ax, self.data)
+            self._drawn_for[graph_type] = self.data
+
+        for name, axes in self.axes.items():
+            axes.set_visible(name == graph_type)
+        self.graph_type = graph_type
+
+    def _student_axis(self, ax, student_names):
+        positions = range(len(student_names))
+        ax.set_xticks(positions, student_names, rotation=45, ha='right')
+        ax.set_xlabel('Student Name')
+        ax.set_ylabel('Total Marks')
+        return positions
+
+    def _draw_bar(self, ax, data):
+        student_names = data['student_names']
+        total_marks = data['total_marks']
+
+        bars = self.artists.get('bar')
+        if bars is not None and len(bars) == len(total_marks):
+            for bar, total in zip(bars, total_marks):
+                bar.set_height(total)
+        else:
+            ax.cla()
+            self.artists['bar'] = ax.bar(range(len(total_marks)), total_marks, color='blue')
+
+        self._student_axis(ax, student_names)
+        ax.set_title(f"Total Marks by Student (average {data['mean']:.1f})")
+        ax.relim()
+        ax.autoscale_view()
+
+    def _draw_line(self, ax, data):
+        total_marks = data['total_marks']
+
+        line = self.artists.get('line')
+        positions = range(len(total_marks))
+        if line is not None:
+            line.set_data(positions, total_marks)
+        else:
+            self.artists['line'], = ax.plot(positions, total_marks, marker='o', color='yellow')
+
+        self._student_axis(ax, data['student_names'])
+        ax.set_title('Marks Trend')
+        ax.relim()
+        ax.autoscale_view()
+
+    def _draw_scatter(self, ax, data):
+        total_marks = data['total_marks']
+
+        points = self.artists.get('scatter')
+        positions = range(len(total_marks))
+        if points is not None:
+            points.set_offsets(list(zip(positions, total_marks)))
+        else:
+            self.artists['scatter'] = ax.scatter(positions, total_marks, color='orange')
+
+        self._student_axis(ax, data['student_names'])
+        ax.set_title('Marks Distribution')
+        ax.ignore_existing_data_limits = True
+        ax.update_datalim(list(zip(positions, total_marks)))
+        ax.autoscale_view()
+
+    def _draw_pie(self, ax, data):
+        # Wedge geometry depends on every count, so the pie is always redrawn,
+        # but only its own axes is cleared
+        ax.cla()
+        labels = []
+        sizes = []
+
+        for grade, count in data['grades'].items():
+            if count > 0:
+                labels.append(f'Grade {grade} ({count})')
+                sizes.append(count)
+
+        if sum(sizes) > 0:
+            ax.pie(sizes, labels=labels, colors=PIE_COLOURS[:len(sizes)],
+                   autopct='%1.1f%%', startangle=90)
+            ax.set_title('Grade Distribution')
+            ax.axis('equal')
+        else:
+            ax.text(0.5, 0.5, 'No grade data available',
+                    horizontalalignment='center',
+                    verticalalignment='center')
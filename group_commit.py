@@ -0,0 +1,94 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import nullcontext
+
+# Write-behind for MarksDatabase: callers queue a write and get a Future
+# straight away; a single writer thread applies whatever has queued up in
+# one transaction. Used by marks_server for writes from every client and by
+# the Tk app so data entry never waits on an fsync per row.
+
+
+class GroupCommitWriter:
+    # Writes queue up here while the previous batch is committing; the next
+    # batch takes all of them into one transaction once max_batch writes are
+    # waiting or max_delay seconds have passed since the first one. Each
+    # write runs in its own savepoint, so one failing write does not undo
+    # the others in its batch. MarksDatabase holds back each write's cache
+    # invalidation until the batch commits, so only the modules it touched
+    # are dropped from the cache
+    def __init__(self, db, max_batch=256, max_delay=0.002):
+        self.db = db
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.batches = 0
+        self.writes = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name='marks-writer', daemon=True)
+        self._thread.start()
+
+    @property
+    def pending(self):
+        return self._queue.qsize()
+
+    def submit(self, method, args):
+        future = Future()
+        self._queue.put((method, args, future))
+        return future
+
+    def stop(self):
+        # Everything queued before stop() is still written
+        self._queue.put(None)
+        self._thread.join()
+
+    def _take_batch(self):
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = time.perf_counter() + self.max_delay
+        while len(batch) < self.max_batch:
+            try:
+                item = self._queue.get(timeout=max(deadline - time.perf_counter(), 0))
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _transaction(self):
+        # A MarksClient has no local transaction; the server group-commits
+        transaction = getattr(self.db, 'transaction', None)
+        return transaction() if transaction else nullcontext()
+
+    def _run(self):
+        while True:
+            batch = self._take_batch()
+            if batch is None:
+                return
+
+            results = []
+            try:
+                with self._transaction():
+                    for method, args, future in batch:
+                        try:
+                            with self._transaction():
+                                results.append((future, getattr(self.db, method)(*args), None))
+                        except Exception as e:
+                            results.append((future, None, e))
+            except Exception as e:
+                # The commit itself failed: nothing in the batch was written
+                for _, _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.writes += len(batch)
+            for future, result, error in results:
+                if error is None:
+                    future.set_result(result)
+                else:
+                    future.set_exception(error)
@@ -1,25 +1,96 @@
+import time
+
+_import_started = time.perf_counter()
+
+import datetime
+import logging
+import os
+import sys
+import threading
 import tkinter as tk
-from tkinter import messagebox, ttk
-import sqlite3
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from tkinter import filedialog, messagebox, ttk
+
+from group_commit import GroupCommitWriter
+from marks_client import MarksClient
+from marks_db import GRADE_BANDS, MarksDatabase
+from marks_export import BATCH_SIZE, MarkExportError, export_marks
+from marks_import import MarkImportError, count_rows, import_marks, validate_row
+from profiling import ActionProfiler
+from task_runner import TaskRunner
+
+# matplotlib is imported on first use of the Visualisation page; most
+# sessions are data entry only and never pay for it
+IMPORT_SECONDS = time.perf_counter() - _import_started
+
+STARTUP_TIMING = "--timing" in sys.argv or bool(os.environ.get("MARKS_STARTUP_TIMING"))
+# Submitted marks are written behind the form: a group commit happens once
+# this many entries are waiting or this long after the first one
+WRITE_BATCH_SIZE = 50
+WRITE_DELAY_SECONDS = 0.5
+# Module entry grid: (marks_import column, heading, entry width) per cell,
+# in the order the keyboard moves through them
+GRID_FIELDS = (
+    ("student_id", "Student ID", 15),
+    ("student_name", "Student Name", 25),
+    ("gender", "Gender", 8),
+    ("coursework_1_mark", "Coursework 1", 12),
+    ("coursework_2_mark", "Coursework 2", 12),
+    ("coursework_3_mark", "Coursework 3", 12),
+)
+GRID_GENDERS = {"m": "Male", "f": "Female"}
+GRID_STATES = {"pending": "Unsaved", "saving": "Saving...", "saved": "Saved"}
+# Quick search waits for a pause in typing and shows at most this many matches
+QUICK_SEARCH_DELAY_MS = 250
+QUICK_SEARCH_LIMIT = 50
+# Per-action timings are logged and F12 opens a live stats panel
+PROFILING = "--profile" in sys.argv or bool(os.environ.get("MARKS_PROFILE"))
+
+
+def command_line_option(name):
+    if name in sys.argv[:-1]:
+        return sys.argv[sys.argv.index(name) + 1]
+    return None
+
+
+# Client mode: --server http://host:8765 (or MARKS_SERVER) uses a shared
+# marks_server.py instead of opening marks.db directly
+SERVER_URL = command_line_option("--server") or os.environ.get("MARKS_SERVER")
+SERVER_TOKEN = command_line_option("--token") or os.environ.get("MARKS_SERVER_TOKEN")
 
 
 class MarkRegistrationSystem:
     def __init__(self, root):
+        self.startup_phases = [("imports", IMPORT_SECONDS)]
+        phase_started = time.perf_counter()
+
         self.root = root
         self.root.title("Mark Registration System")
         self.root.geometry("1650x870")
         self.tree = ttk.Treeview(root)
 
         # Initialize database
+        if SERVER_URL:
+            self.db = MarksClient(SERVER_URL, SERVER_TOKEN)
+            self.root.title(f"Mark Registration System ({SERVER_URL})")
+        else:
+            self.db = MarksDatabase()
+        self.profiler = ActionProfiler(enabled=PROFILING)
+        self.profiler_panel = None
+        if PROFILING:
+            logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(message)s")
+            self.db.set_profiler(self.profiler)
+            self.profiler.listeners.append(self.refresh_profiler_panel)
+            self.root.bind("<F12>", lambda event: self.show_profiler_panel())
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
         self.setup_database()
-        self.update_table_mark('marks', 'obervation', 'varchar(255)')
-        self.update_table_mark('program_info', 'admission_year', 'INTGER')
+
+        self.startup_phases.append(("database", time.perf_counter() - phase_started))
+        phase_started = time.perf_counter()
 
         # Variables
         self.marks_updated = False
         self.marks_viewed = False
+        self.plotting_loaded = False
 
         self.num_students = tk.IntVar()
         self.num_modules = tk.IntVar()
@@ -33,56 +104,58 @@ class MarkRegistrationSystem:
         self.student_name = tk.StringVar()
         self.gender = tk.StringVar()
         self.date_of_entry = tk.StringVar()
-
-        self.current_page = tk.Frame(self.root)
-        self.current_page.pack()
+        self.grid_module_code = tk.StringVar()
+        self.grid_module_name = tk.StringVar()
+        self.grid_date_of_entry = tk.StringVar()
+        # student_id -> [row in insert_mark order, state] for the entry grid
+        self.grid_rows = {}
+        # Set by New Module while rows are still saving; the grid is cleared
+        # once they are on disk
+        self.grid_clear_requested = False
+        self.page_size = tk.IntVar(value=100)
+
+        # Each page is built on its first visit and kept, keyed by name
+        self.pages = {}
+        self.current_page = None
         self.setup_navigation()
+        self.setup_status_bar()
+        self.writer = GroupCommitWriter(self.db, WRITE_BATCH_SIZE, WRITE_DELAY_SECONDS)
+        self.pending_writes = []
+        self.saved_writes = 0
+        self.failed_writes = []
+        self.tasks = TaskRunner(self.root, on_busy=self.set_busy)
         self.show_home()
 
+        self.startup_phases.append(("widgets", time.perf_counter() - phase_started))
+        if STARTUP_TIMING:
+            self.root.after_idle(self.report_startup_timing)
+
     def setup_database(self):
-        conn = sqlite3.connect('marks.db')
-        cursor = conn.cursor()
-
-        # Create tables
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS program_info (
-            id INTEGER PRIMARY KEY,
-            num_students INTEGER,
-            num_modules INTEGER
-        )
-        ''')
-
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS marks (
-            id INTEGER PRIMARY KEY,
-            module_code TEXT,
-            module_name TEXT,
-            coursework_1_mark INTEGER,
-            coursework_2_mark INTEGER,
-            coursework_3_mark INTEGER,
-            student_id TEXT,
-            student_name TEXT,
-            gender TEXT,
-            date_of_entry TEXT
-        )
-        ''')
-
-        conn.commit()
-        conn.close()
-    def update_table_mark(self, table, my_column, column_type):
+        # Applies any pending schema migrations in one transaction; a
+        # current database is only checked via PRAGMA user_version
         try:
-                conn = sqlite3.connect('marks.db')
-                cursor = conn.cursor()
-                cursor.execute(f"PRAGMA table_info({table})")
-                columns = [info[1] for info in cursor.fetchall()]
-                if my_column not in columns:
-                    cursor.execute(f"ALTER TABLE {table} ADD COLUMN {my_column} {column_type}")
-                    conn.commit()
-                conn.close()
+            self.db.migrate()
         except Exception as e:
-            messagebox.showerror("Error", f"An error occurred: {e}") 
-
+            messagebox.showerror("Error", f"An error occurred: {e}")
 
+    def report_startup_timing(self):
+        # Runs once the first frame has been laid out
+        total = time.perf_counter() - _import_started
+        for phase, seconds in self.startup_phases:
+            print(f"startup {phase:<10} {seconds * 1000:8.1f} ms")
+        print(f"startup {'total':<10} {total * 1000:8.1f} ms")
+
+    def on_close(self):
+        # Waits for update/delete/Save All tasks, then for anything still
+        # queued in the writer, including unsaved grid rows, before the
+        # database closes
+        self.tasks.shutdown()
+        pending = [row for row, state in self.grid_rows.values() if state == "pending"]
+        if pending:
+            self.writer.submit("insert_marks_many", (pending,))
+        self.writer.stop()
+        self.db.close()
+        self.root.destroy()
 
     def setup_navigation(self):
         nav_frame = tk.Frame(self.root, bg="#0288d1")
@@ -93,7 +166,8 @@ class MarkRegistrationSystem:
             ("Input Marks", self.show_input_marks),
             ("View Marks", self.show_view_marks),
             ("Update Marks", self.show_update_marks),
-            ("Visualisation", self.show_visualisation)
+            ("Visualisation", self.show_visualisation),
+            ("Overview", self.show_module_overview)
         ]
 
         for text, command in nav_buttons:
@@ -101,15 +175,107 @@ class MarkRegistrationSystem:
                             font=("Arial", 25, "bold"), command=command)
             btn.pack(side=tk.LEFT, padx=50, pady=20)
 
-    def clear_content(self):
-        if self.current_page:
-            self.current_page.pack_forget()
-        self.current_page = tk.Frame(self.root)
-        self.current_page.pack(fill=tk.BOTH, expand=True)
+    def setup_status_bar(self):
+        status_frame = tk.Frame(self.root, bd=1, relief=tk.SUNKEN)
+        status_frame.pack(side=tk.BOTTOM, fill=tk.X)
+
+        self.status_label = tk.Label(status_frame, text="Ready", font=("Arial", 10), anchor=tk.W)
+        self.status_label.pack(side=tk.LEFT, padx=10)
+        self.busy_bar = ttk.Progressbar(status_frame, length=150, mode="indeterminate")
+        self.cancel_button = tk.Button(status_frame, text="Cancel", command=self.cancel_tasks,
+                                       font=("Arial", 10))
+
+        # Durable state of submitted marks; click it to review failed entries
+        self.write_status = tk.Label(status_frame, text="", font=("Arial", 10), anchor=tk.E)
+        self.write_status.pack(side=tk.RIGHT, padx=10)
+        self.write_status.bind("<Button-1>", lambda event: self.show_failed_writes())
+
+    def set_busy(self, busy):
+        # Busy indicator shown while background queries/rendering are pending
+        if busy:
+            if not self.busy_bar.winfo_ismapped():
+                self.busy_bar.pack(side=tk.RIGHT, padx=10)
+                self.busy_bar.start(15)
+            self.status_label.config(text="Working...")
+        elif self.busy_bar.winfo_ismapped():
+            self.busy_bar.stop()
+            self.busy_bar.pack_forget()
+            self.status_label.config(text="Ready")
+
+        # Writes cannot be stopped once they start, so Cancel is only offered
+        # while a read, import or export is running
+        if busy and self.tasks.cancellable:
+            if not self.cancel_button.winfo_ismapped():
+                self.cancel_button.pack(side=tk.RIGHT, padx=10, after=self.write_status)
+        else:
+            self.cancel_button.pack_forget()
+
+    def show_profiler_panel(self):
+        if self.profiler_panel and self.profiler_panel.winfo_exists():
+            self.profiler_panel.lift()
+            return
+
+        self.profiler_panel = tk.Toplevel(self.root)
+        self.profiler_panel.title("Action Timings")
+        self.profiler_panel.geometry("900x300")
+
+        columns = ("Action", "Calls", "Last ms", "Mean ms", "Max ms", "Last phases", "Queries")
+        self.profiler_tree = ttk.Treeview(self.profiler_panel, columns=columns, show="headings")
+        for col in columns:
+            self.profiler_tree.heading(col, text=col)
+            self.profiler_tree.column(col, width=300 if col == "Last phases" else 90)
+        self.profiler_tree.pack(fill=tk.BOTH, expand=True)
+        self.refresh_profiler_panel()
+
+    def refresh_profiler_panel(self, timing=None):
+        # Listener for finished actions; they always finish on the Tk thread
+        if not (self.profiler_panel and self.profiler_panel.winfo_exists()):
+            return
+
+        for item in self.profiler_tree.get_children():
+            self.profiler_tree.delete(item)
+        for action, stats in sorted(self.profiler.stats.items()):
+            last = stats['last']
+            phases = "  ".join(f"{name} {seconds * 1000:.1f}"
+                               for name, seconds in sorted(last.phases.items()))
+            self.profiler_tree.insert("", tk.END, values=(
+                action, stats['count'], f"{last.total * 1000:.1f}",
+                f"{stats['total'] / stats['count'] * 1000:.1f}", f"{stats['max'] * 1000:.1f}",
+                phases, len(last.queries)))
+
+    def cancel_tasks(self):
+        self.tasks.cancel()
+        self.status_label.config(text="Cancelled")
+
+    def submit_read(self, fn, *args, **kwargs):
+        # Cancel interrupts the query a read is running; against a server
+        # the request still completes but its result is dropped
+        interruptible = getattr(self.db, "interruptible", None)
+        if interruptible is None:
+            return self.tasks.submit(fn, *args, **kwargs)
+        run, interrupt = interruptible(fn)
+        return self.tasks.submit(run, *args, interrupt=interrupt, **kwargs)
+
+    def show_page(self, name, build):
+        # Switching pages only swaps which cached frame is packed; build()
+        # fills a page's frame the first time it is shown. Callers refresh
+        # the page's data themselves
+        page = self.pages.get(name)
+        if page is None:
+            page = self.pages[name] = tk.Frame(self.root)
+            self.current_page, previous = page, self.current_page
+            build()
+        else:
+            previous, self.current_page = self.current_page, page
+        if previous is not page:
+            if previous is not None:
+                previous.pack_forget()
+            page.pack(fill=tk.BOTH, expand=True)
 
     def show_home(self):
-        self.clear_content()
+        self.show_page("home", self.build_home)
 
+    def build_home(self):
         tk.Label(self.current_page, text="Welcome to the Mark Registration System",
                  font=("Arial", 20), pady=30).pack()
 
@@ -130,16 +296,7 @@ class MarkRegistrationSystem:
             return
 
         try:
-            conn = sqlite3.connect('marks.db')
-            cursor = conn.cursor()
-
-            cursor.execute('''
-            INSERT INTO program_info (num_students, num_modules)
-            VALUES (?, ?)
-            ''', (self.num_students.get(), self.num_modules.get()))
-
-            conn.commit()
-            conn.close()
+            self.db.save_program_info(self.num_students.get(), self.num_modules.get())
 
             messagebox.showinfo("Success", "Records saved successfully!")
             self.show_input_marks()
@@ -147,8 +304,10 @@ class MarkRegistrationSystem:
             messagebox.showerror("Error", f"An error occurred: {e}")
 
     def show_input_marks(self):
-        self.clear_content()
+        self.show_page("input_marks", self.build_input_marks)
+        self.input_next_button.config(state=tk.DISABLED)
 
+    def build_input_marks(self):
         tk.Label(self.current_page, text="Mark Entry Form",
                  font=("Arial", 20), pady=1).pack()
 
@@ -177,9 +336,289 @@ class MarkRegistrationSystem:
                   bg="#f44336", fg="black").pack(side=tk.LEFT, padx=10)
 
         # Next button (Initially Disabled)
-        self.next_button = tk.Button(button_frame, text="Next", command=self.next_action,
-                                     bg="#4CAF50", fg="white", state=tk.DISABLED)
-        self.next_button.pack(side=tk.LEFT, padx=10)
+        self.input_next_button = tk.Button(button_frame, text="Next", command=self.next_action,
+                                           bg="#4CAF50", fg="white", state=tk.DISABLED)
+        self.input_next_button.pack(side=tk.LEFT, padx=10)
+
+        # Bulk import from a CSV/Excel file
+        import_frame = tk.Frame(self.current_page)
+        import_frame.pack(pady=5)
+
+        tk.Button(import_frame, text="Enter Whole Module...", command=self.show_module_grid,
+                  bg="#95B3D7", fg="black").pack(side=tk.LEFT, padx=10)
+        tk.Button(import_frame, text="Import File...", command=self.import_file,
+                  bg="#95B3D7", fg="black").pack(side=tk.LEFT, padx=10)
+        self.import_progress = ttk.Progressbar(import_frame, length=300, mode="determinate")
+        self.import_progress.pack(side=tk.LEFT, padx=10)
+        self.import_status = tk.Label(import_frame, text="", font=("Arial", 10))
+        self.import_status.pack(side=tk.LEFT, padx=10)
+
+    def import_file(self):
+        if SERVER_URL:
+            # Imports stream straight into a local database in one transaction
+            messagebox.showinfo("Import", "Importing is done on the server: "
+                                          "run marks_cli.py import there.")
+            return
+        path = filedialog.askopenfilename(
+            title="Import Marks",
+            filetypes=[("Marks files", "*.csv *.xlsx"), ("CSV files", "*.csv"),
+                       ("Excel files", "*.xlsx"), ("All files", "*.*")])
+        if not path:
+            return
+
+        total = count_rows(path)
+        self.import_progress.config(maximum=max(total, 1), value=0)
+        processed = [0]
+        cancelled = threading.Event()
+
+        # The worker only records how far it got; the bar is refreshed from
+        # the Tk thread until the import task finishes. Raising here on
+        # Cancel rolls the whole import back
+        def progress(count):
+            processed[0] = count
+            if cancelled.is_set():
+                raise MarkImportError("Import cancelled")
+
+        def refresh_progress():
+            if not task.future.done():
+                self.import_progress.config(value=processed[0])
+                self.import_status.config(text=f"{processed[0]} / {total} rows")
+                self.root.after(100, refresh_progress)
+
+        def imported(result):
+            self.import_progress.config(value=processed[0])
+            self.import_status.config(text=f"{processed[0]} / {total} rows")
+
+            message = f"Imported {result.imported} rows."
+            if result.rejected:
+                message += f"\n{result.rejected} rows were rejected:\n" + "\n".join(result.errors)
+                messagebox.showwarning("Import Complete", message)
+            else:
+                messagebox.showinfo("Success", message)
+
+        def failed(e):
+            if isinstance(e, MarkImportError):
+                messagebox.showerror("Error", f"Import failed: {e}")
+            else:
+                messagebox.showerror("Error", f"An error occurred: {e}")
+
+        task = self.tasks.submit(import_marks, self.db, path, 1000, progress,
+                                 on_done=imported, on_error=failed, interrupt=cancelled.set)
+        refresh_progress()
+
+    def show_module_grid(self):
+        self.show_page("module_grid", self.build_module_grid)
+        self.lock_grid_module()
+        self.update_grid_status()
+        if self.grid_rows:
+            self.grid_entries[0].focus_set()
+        else:
+            self.grid_module_entries[0].focus_set()
+
+    def build_module_grid(self):
+        tk.Label(self.current_page, text="Module Entry Grid",
+                 font=("Arial", 20), pady=1).pack()
+        tk.Label(self.current_page,
+                 text="Enter moves to the next cell and adds the row from the last one; "
+                      "Gender takes M or F. Double-click a row to correct it, Delete removes "
+                      "an unsaved row and Ctrl+S saves.",
+                 font=("Arial", 10)).pack(pady=5)
+
+        # The module is entered once; it is locked while the grid has rows
+        module_frame = tk.Frame(self.current_page)
+        module_frame.pack(pady=5)
+        self.grid_module_entries = []
+        for label_text, variable in (("Module Code", self.grid_module_code),
+                                     ("Module Name", self.grid_module_name),
+                                     ("Date of Entry", self.grid_date_of_entry)):
+            tk.Label(module_frame, text=label_text, font=("Arial", 12)).pack(side=tk.LEFT, padx=5)
+            entry = tk.Entry(module_frame, textvariable=variable)
+            entry.pack(side=tk.LEFT, padx=5)
+            self.grid_module_entries.append(entry)
+        if not self.grid_date_of_entry.get():
+            self.grid_date_of_entry.set(datetime.date.today().isoformat())
+
+        entry_frame = tk.Frame(self.current_page)
+        entry_frame.pack(pady=5)
+        self.grid_entries = []
+        for column, (_, label_text, width) in enumerate(GRID_FIELDS):
+            tk.Label(entry_frame, text=label_text, font=("Arial", 12)).grid(row=0, column=column, padx=5)
+            entry = tk.Entry(entry_frame, width=width)
+            entry.grid(row=1, column=column, padx=5)
+            entry.bind("<Return>", lambda event, column=column: self.grid_next_cell(column))
+            entry.bind("<Escape>", lambda event: self.clear_grid_entry())
+            self.grid_entries.append(entry)
+
+        button_frame = tk.Frame(self.current_page)
+        button_frame.pack(pady=5)
+        tk.Button(button_frame, text="Add Row", command=self.add_grid_row,
+                  bg="#00bcd4", fg="black").pack(side=tk.LEFT, padx=10)
+        tk.Button(button_frame, text="Save", command=self.save_grid_rows,
+                  bg="#4CAF50", fg="white").pack(side=tk.LEFT, padx=10)
+        tk.Button(button_frame, text="New Module", command=self.new_grid_module,
+                  bg="#95B3D7", fg="black").pack(side=tk.LEFT, padx=10)
+        self.grid_status = tk.Label(button_frame, text="", font=("Arial", 10))
+        self.grid_status.pack(side=tk.LEFT, padx=10)
+
+        columns = tuple(label_text for _, label_text, _ in GRID_FIELDS) + ("Status",)
+        self.grid_tree = ttk.Treeview(self.current_page, columns=columns, show="headings", height=15)
+        for col in columns:
+            self.grid_tree.heading(col, text=col)
+            self.grid_tree.column(col, width=150)
+        self.grid_tree.pack(fill=tk.BOTH, expand=True, padx=20, pady=5)
+        self.grid_tree.bind("<Double-1>", self.edit_grid_row)
+        self.grid_tree.bind("<Return>", self.edit_grid_row)
+        self.grid_tree.bind("<Delete>", self.remove_grid_rows)
+
+        for widget in self.grid_module_entries + self.grid_entries + [self.grid_tree]:
+            widget.bind("<Control-s>", lambda event: self.save_grid_rows() or "break")
+
+    def grid_next_cell(self, column):
+        if column < len(self.grid_entries) - 1:
+            self.grid_entries[column + 1].focus_set()
+            self.grid_entries[column + 1].select_range(0, tk.END)
+        else:
+            self.add_grid_row()
+        return "break"
+
+    def clear_grid_entry(self):
+        for entry in self.grid_entries:
+            entry.delete(0, tk.END)
+        self.grid_entries[0].focus_set()
+
+    def lock_grid_module(self):
+        state = "readonly" if self.grid_rows else tk.NORMAL
+        for entry in self.grid_module_entries:
+            entry.config(state=state)
+
+    def add_grid_row(self):
+        student_id, student_name, gender, cw1, cw2, cw3 = \
+            [entry.get().strip() for entry in self.grid_entries]
+        gender = GRID_GENDERS.get(gender.lower(), gender)
+        try:
+            row = validate_row((self.grid_module_code.get().strip(),
+                                self.grid_module_name.get().strip(),
+                                cw1, cw2, cw3, student_id, student_name, gender,
+                                self.grid_date_of_entry.get().strip()))
+        except MarkImportError as e:
+            self.grid_status.config(text=f"Row not added: {e}", fg="red")
+            # Put the cursor on the cell at fault
+            for column, (field, _, _) in enumerate(GRID_FIELDS):
+                if str(e).startswith(field):
+                    self.grid_entries[column].focus_set()
+                    self.grid_entries[column].select_range(0, tk.END)
+            return
+
+        # A student entered twice keeps the latest marks
+        self.grid_rows[row[5]] = [row, "pending"]
+        self.show_grid_row(row[5])
+        self.grid_tree.see(row[5])
+        self.clear_grid_entry()
+        self.lock_grid_module()
+
+        pending = sum(1 for _, state in self.grid_rows.values() if state == "pending")
+        if pending >= WRITE_BATCH_SIZE:
+            self.save_grid_rows()
+        else:
+            self.update_grid_status()
+
+    def show_grid_row(self, student_id):
+        row, state = self.grid_rows[student_id]
+        values = (row[5], row[6], row[7], row[2], row[3], row[4], GRID_STATES[state])
+        # Rows are keyed by student ID, so a re-entered student replaces its row
+        if self.grid_tree.exists(student_id):
+            self.grid_tree.item(student_id, values=values)
+        else:
+            self.grid_tree.insert("", tk.END, iid=student_id, values=values)
+
+    def edit_grid_row(self, event):
+        selected = self.grid_tree.selection()
+        if len(selected) != 1:
+            return
+        row, _ = self.grid_rows[selected[0]]
+        # Adding the row again replaces it and saves the corrected marks
+        for entry, value in zip(self.grid_entries, (row[5], row[6], row[7], row[2], row[3], row[4])):
+            entry.delete(0, tk.END)
+            entry.insert(0, value)
+        self.grid_entries[3].focus_set()
+        self.grid_entries[3].select_range(0, tk.END)
+        return "break"
+
+    def remove_grid_rows(self, event=None):
+        skipped = 0
+        for student_id in self.grid_tree.selection():
+            if self.grid_rows[student_id][1] != "pending":
+                skipped += 1
+                continue
+            del self.grid_rows[student_id]
+            self.grid_tree.delete(student_id)
+        self.lock_grid_module()
+        self.update_grid_status()
+        if skipped:
+            self.grid_status.config(text="Saved rows are changed on the Update Marks page",
+                                    fg="red")
+        return "break"
+
+    def save_grid_rows(self):
+        pending = [(student_id, entry[0]) for student_id, entry in self.grid_rows.items()
+                   if entry[1] == "pending"]
+        if not pending:
+            return
+        for student_id, _ in pending:
+            self.grid_rows[student_id][1] = "saving"
+            self.show_grid_row(student_id)
+        self.update_grid_status()
+
+        def finished(state):
+            for student_id, row in pending:
+                # A row corrected while this batch was saving stays unsaved
+                entry = self.grid_rows.get(student_id)
+                if entry is not None and entry[0] is row:
+                    entry[1] = state
+                    self.show_grid_row(student_id)
+
+        def saved(count):
+            finished("saved")
+            self.update_grid_status()
+            if self.grid_clear_requested:
+                self.new_grid_module()
+
+        def failed(e):
+            # The rows stay in the grid, unsaved, for another try
+            finished("pending")
+            self.grid_clear_requested = False
+            self.grid_status.config(text=f"Save failed: {e}", fg="red")
+
+        # One transaction for the batch, through the same writer as the form
+        rows = [row for _, row in pending]
+        self.tasks.track(self.writer.submit("insert_marks_many", (rows,)),
+                         on_done=saved, on_error=failed)
+
+    def new_grid_module(self):
+        # Anything not yet saved is saved first, and the grid is only
+        # cleared once every row is on disk
+        self.save_grid_rows()
+        if any(state != "saved" for _, state in self.grid_rows.values()):
+            self.grid_clear_requested = True
+            self.grid_status.config(text="Saving before starting a new module...", fg="black")
+            return
+
+        self.grid_clear_requested = False
+        self.grid_rows = {}
+        for item in self.grid_tree.get_children():
+            self.grid_tree.delete(item)
+        self.lock_grid_module()
+        self.grid_module_code.set("")
+        self.grid_module_name.set("")
+        self.clear_grid_entry()
+        self.update_grid_status()
+        self.grid_module_entries[0].focus_set()
+
+    def update_grid_status(self):
+        states = [state for _, state in self.grid_rows.values()]
+        text = (f"{len(states)} students: {states.count('saved')} saved, "
+                f"{states.count('pending') + states.count('saving')} unsaved")
+        self.grid_status.config(text=text, fg="black")
 
     def create_form_entry(self, label_text, variable):
         tk.Label(self.current_page, text=label_text, font=("Arial", 12)).pack(pady=5)
@@ -196,47 +635,74 @@ class MarkRegistrationSystem:
         self.gender.set("")
         self.date_of_entry.set("")
 
+    def form_text(self, variable):
+        # What was typed, even where an IntVar's get() would fail
+        return str(self.root.getvar(str(variable))).strip()
+
     def submit_marks(self):
-        if not all([self.module_code.get(), self.module_name.get(),
-                    self.coursework_1_mark.get(), self.coursework_2_mark.get(),
-                    self.coursework_3_mark.get(), self.student_id.get(),
-                    self.student_name.get(), self.gender.get(),
-                    self.date_of_entry.get()]):
-            messagebox.showerror("Error", "Please fill in all fields!")
+        # Checked the same way as grid rows and imports before it is queued:
+        # a mark of 0 is fine, one over 100 is not
+        try:
+            values = validate_row([self.form_text(variable) for variable in (
+                self.module_code, self.module_name, self.coursework_1_mark,
+                self.coursework_2_mark, self.coursework_3_mark, self.student_id,
+                self.student_name, self.gender, self.date_of_entry)])
+        except MarkImportError as e:
+            messagebox.showerror("Error", f"Marks not submitted: {e}")
             return
 
-        try:
-            # Debug statement to check coursework_1_mark value
-            print(f"Coursework 1 Mark: {self.coursework_1_mark.get()}")
-
-            conn = sqlite3.connect('marks.db')
-            cursor = conn.cursor()
-
-            cursor.execute('''
-            INSERT INTO marks (
-                module_code, module_name, coursework_1_mark, coursework_2_mark,
-                coursework_3_mark, student_id, student_name, gender, date_of_entry
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                self.module_code.get(), self.module_name.get(),
-                self.coursework_1_mark.get(), self.coursework_2_mark.get(),
-                self.coursework_3_mark.get(), self.student_id.get(),
-                self.student_name.get(), self.gender.get(),
-                self.date_of_entry.get()
-            ))
-
-            conn.commit()
-            conn.close()
-
-            messagebox.showinfo("Success", "Marks submitted successfully!")
+        timing = self.profiler.start("submit_marks")
+
+        # Queued for the next group commit; the form is free straight away
+        # and the status bar reports when the entry is on disk
+        self.pending_writes.append((self.writer.submit("insert_mark", values), values))
+        if len(self.pending_writes) == 1:
+            self.root.after(100, self.refresh_write_status)
 
+        with timing.phase("widget_update"):
             # Enable the Next button
-            self.next_button.config(state=tk.NORMAL)
+            self.input_next_button.config(state=tk.NORMAL)
 
             self.reset_form()
+            self.update_write_status()
+        timing.finish()
+
+    def refresh_write_status(self):
+        # Polls the queued entries from the Tk thread until all are written
+        still_pending = []
+        for future, values in self.pending_writes:
+            if not future.done():
+                still_pending.append((future, values))
+            elif future.exception() is not None:
+                self.failed_writes.append((values, future.exception()))
+            else:
+                self.saved_writes += 1
+        self.pending_writes = still_pending
+        self.update_write_status()
+        if self.pending_writes:
+            self.root.after(100, self.refresh_write_status)
+
+    def update_write_status(self):
+        if self.failed_writes:
+            text = f"{len(self.failed_writes)} entries NOT saved - click for details"
+            colour = "red"
+        elif self.pending_writes:
+            text = f"Saving {len(self.pending_writes)} entries..."
+            colour = "black"
+        else:
+            text = f"All entries saved ({self.saved_writes} this session)"
+            colour = "dark green"
+        self.write_status.config(text=text, fg=colour)
 
-        except Exception as e:
-            messagebox.showerror("Error", f"An error occurred: {e}")
+    def show_failed_writes(self):
+        if not self.failed_writes:
+            return
+        lines = [f"{values[5]} / {values[0]}: {error}" for values, error in self.failed_writes]
+        messagebox.showwarning("Entries Not Saved",
+                               "These entries were not saved and need to be entered again:\n"
+                               + "\n".join(lines))
+        self.failed_writes.clear()
+        self.update_write_status()
 
 
     def next_action(self):
@@ -244,13 +710,37 @@ class MarkRegistrationSystem:
         # You can add navigation logic here
 
     def show_view_marks(self):
-        self.clear_content()
+        self.show_page("view_marks", self.build_view_marks)
         self.marks_viewed = False  # Reset the viewed flag when entering the page
+        self.view_next_button.config(state=tk.DISABLED)
+        # Marks may have changed elsewhere; the open page is re-read and any
+        # unsaved edits are laid back over it
+        self.load_results_page(self.page_starts[-1])
 
+    def build_view_marks(self):
         tk.Label(self.current_page, text="View Marks", font=("Arial", 20), pady=10).pack()
 
+        # Search-as-you-type over student names/IDs and module codes/names;
+        # double-click a match to edit that student's marks
+        quick_frame = tk.Frame(self.current_page)
+        quick_frame.pack(fill=tk.X, padx=20)
+        tk.Label(quick_frame, text="Find student or module:", font=("Arial", 12)).pack(side=tk.LEFT, padx=5)
+        self.quick_search_text = tk.StringVar()
+        tk.Entry(quick_frame, textvariable=self.quick_search_text, width=40).pack(side=tk.LEFT, padx=5)
+        self.quick_search_status = tk.Label(quick_frame, text="", font=("Arial", 10))
+        self.quick_search_status.pack(side=tk.LEFT, padx=5)
+        self.quick_search_text.trace_add("write", lambda *args: self.schedule_quick_search())
+        self.quick_search_job = None
+
+        self.quick_results = ttk.Treeview(self.current_page, show="headings", height=5,
+                                          columns=("Student ID", "Student Name", "Module Code", "Module Name"))
+        for col in self.quick_results["columns"]:
+            self.quick_results.heading(col, text=col)
+        self.quick_results.bind("<Double-1>", self.open_quick_result)
+
         # Search feature
-        tk.Label(self.current_page, text="Module Code:", font=("Arial", 12)).pack(pady=5)
+        self.search_code_label = tk.Label(self.current_page, text="Module Code:", font=("Arial", 12))
+        self.search_code_label.pack(pady=5)
         self.search_code = tk.Entry(self.current_page)
         self.search_code.pack(pady=5)
 
@@ -263,9 +753,33 @@ class MarkRegistrationSystem:
                                                                                                        padx=10)
 
         # Next Button (Initially Disabled)
-        self.next_button = tk.Button(button_frame, text="Next", command=self.next_page3,
-                                     bg="#4CAF50", fg="white", state=tk.DISABLED)
-        self.next_button.pack(side=tk.LEFT, padx=10)
+        self.view_next_button = tk.Button(button_frame, text="Next", command=self.next_page3,
+                                          bg="#4CAF50", fg="white", state=tk.DISABLED)
+        self.view_next_button.pack(side=tk.LEFT, padx=10)
+
+        # Batch edit: double-click a coursework cell to change it; edits are
+        # buffered until Save All writes them in one transaction
+        self.save_all_button = tk.Button(button_frame, text="Save All", command=self.save_all_edits,
+                                         bg="#4CAF50", fg="white", state=tk.DISABLED)
+        self.save_all_button.pack(side=tk.LEFT, padx=10)
+        self.discard_button = tk.Button(button_frame, text="Discard", command=self.discard_edits,
+                                        state=tk.DISABLED)
+        self.discard_button.pack(side=tk.LEFT, padx=10)
+        self.edits_label = tk.Label(button_frame, text="", font=("Arial", 12))
+        self.edits_label.pack(side=tk.LEFT, padx=10)
+
+        # Export the searched module (or everything, before any search),
+        # optionally limited to a range of entry dates
+        export_frame = tk.Frame(self.current_page)
+        export_frame.pack(pady=5)
+        self.export_from = tk.StringVar()
+        self.export_to = tk.StringVar()
+        tk.Label(export_frame, text="Entry dates from:", font=("Arial", 12)).pack(side=tk.LEFT, padx=5)
+        tk.Entry(export_frame, textvariable=self.export_from, width=12).pack(side=tk.LEFT)
+        tk.Label(export_frame, text="to:", font=("Arial", 12)).pack(side=tk.LEFT, padx=5)
+        tk.Entry(export_frame, textvariable=self.export_to, width=12).pack(side=tk.LEFT)
+        tk.Button(export_frame, text="Export...", command=self.export_file,
+                  bg="#00bcd4", fg="black").pack(side=tk.LEFT, padx=10)
 
         # Table for displaying marks
         self.tree = ttk.Treeview(self.current_page, columns=("Student ID", "Student Name", "Coursework 1 Mark",
@@ -273,9 +787,86 @@ class MarkRegistrationSystem:
                                  show="headings")
         for col in self.tree["columns"]:
             self.tree.heading(col, text=col)
+        self.tree.tag_configure("edited", background="#fff3b0")
+        self.tree.bind("<Double-1>", self.edit_cell)
+        self.cell_editor = None
+        self.pending_edits = {}
+
+        # Paging controls: only one page of rows is ever held in the Treeview
+        page_frame = tk.Frame(self.current_page)
+        page_frame.pack(side=tk.BOTTOM, pady=5)
+
+        self.prev_page_button = tk.Button(page_frame, text="< Prev", command=self.prev_results_page,
+                                          state=tk.DISABLED)
+        self.prev_page_button.pack(side=tk.LEFT, padx=5)
+        self.page_label = tk.Label(page_frame, text="", font=("Arial", 12))
+        self.page_label.pack(side=tk.LEFT, padx=5)
+        self.next_page_button = tk.Button(page_frame, text="Next >", command=self.next_results_page,
+                                          state=tk.DISABLED)
+        self.next_page_button.pack(side=tk.LEFT, padx=5)
+
+        tk.Label(page_frame, text="Rows per page:", font=("Arial", 12)).pack(side=tk.LEFT, padx=5)
+        page_size_box = ttk.Combobox(page_frame, textvariable=self.page_size, width=5,
+                                     values=(25, 50, 100, 250, 500), state="readonly")
+        page_size_box.pack(side=tk.LEFT, padx=5)
+        page_size_box.bind("<<ComboboxSelected>>", lambda event: self.load_results_page(0))
 
         self.tree.pack(fill=tk.BOTH, expand=True)
 
+        self.search_term = ""
+        self.page_starts = [0]
+        self.page_has_more = False
+        self.result_count = 0
+
+    def schedule_quick_search(self):
+        # Debounced: only the text as it stands once typing pauses is queried
+        if self.quick_search_job is not None:
+            self.root.after_cancel(self.quick_search_job)
+        self.quick_search_job = self.root.after(QUICK_SEARCH_DELAY_MS, self.quick_search)
+
+    def quick_search(self):
+        self.quick_search_job = None
+        text = self.quick_search_text.get().strip()
+        results = self.quick_results
+        if len(text) < 2:
+            self.tasks.cancel("quick_search")
+            results.pack_forget()
+            self.quick_search_status.config(text="")
+            return
+
+        timing = self.profiler.start("quick_search")
+
+        def found(rows):
+            with timing.phase("widget_update"):
+                for item in results.get_children():
+                    results.delete(item)
+                for row in rows:
+                    results.insert("", tk.END, iid=row[0], values=row[1:5])
+                if not results.winfo_ismapped():
+                    results.pack(fill=tk.X, padx=20, before=self.search_code_label)
+            timing.finish()
+            if len(rows) >= QUICK_SEARCH_LIMIT:
+                self.quick_search_status.config(text=f"Showing the first {QUICK_SEARCH_LIMIT} matches")
+            else:
+                self.quick_search_status.config(text=f"{len(rows)} match(es)")
+
+        def failed(e):
+            timing.finish()
+            self.quick_search_status.config(text=f"Search failed: {e}")
+
+        self.submit_read(timing.wrap(self.db.search), text, QUICK_SEARCH_LIMIT,
+                          on_done=found, on_error=failed, key="quick_search")
+
+    def open_quick_result(self, event):
+        item = self.quick_results.identify_row(event.y)
+        if not item:
+            return
+        student_id, _, module_code, _ = self.quick_results.item(item, "values")
+        self.student_id.set(student_id)
+        self.module_code.set(module_code)
+        self.show_update_marks()
+        self.load_student_marks(student_id)
+
     def search_marks(self):
         search_term = self.search_code.get().strip().lower()  # Trim spaces and convert to lowercase
 
@@ -283,38 +874,252 @@ class MarkRegistrationSystem:
             messagebox.showerror("Error", "Please enter a Module Code to search!")
             return
 
-        try:
-            conn = sqlite3.connect('marks.db')
-            cursor = conn.cursor()
-
-            cursor.execute('''
-            SELECT student_id, student_name, coursework_1_mark, coursework_2_mark,
-                   coursework_3_mark
-            FROM marks
-            WHERE LOWER(module_code) = ?
-            ''', (search_term,))  # Search by module_code, not student_name
-
-            results = cursor.fetchall()
-            conn.close()
-
-            for item in self.tree.get_children():
-                self.tree.delete(item)
-
-            if results:
-                for row in results:
-                    total = sum(row[2:5])  # Sum of coursework marks
-                    self.tree.insert("", tk.END, values=(*row, total))
-                self.marks_viewed = True
-                self.next_button.config(state=tk.NORMAL)  # Enable "Next" button
-                messagebox.showinfo("Success", "Records found and displayed!")
-            else:
-                self.marks_viewed = False
-                self.next_button.config(state=tk.DISABLED)  # Keep "Next" disabled
-                messagebox.showinfo("No Results", "No matching records found.")
+        # Search by module_code, not student_name
+        self.search_term = search_term
+        self.load_results_page(0, announce=True)
 
-        except Exception as e:
+    def load_results_page(self, after_id, announce=False):
+        if not self.search_term:
+            return
+        if after_id == 0:
+            self.page_starts = [0]
+
+        search_term = self.search_term
+        page_size = self.page_size.get()
+        timing = self.profiler.start("search_marks")
+
+        def fetch():
+            # One extra row tells us whether there is a next page
+            rows = self.db.marks_page_for_module(search_term, after_id, page_size + 1)
+            count = self.db.count_marks_for_module(search_term) if announce or after_id == 0 else None
+            return rows, count
+
+        def failed(e):
+            timing.finish()
             messagebox.showerror("Error", f"Failed to search database: {e}")
 
+        self.submit_read(timing.wrap(fetch),
+                          on_done=lambda result: self.show_search_results(*result, announce, timing),
+                          on_error=failed, key="search_marks")
+
+    def next_results_page(self):
+        if self.page_has_more:
+            self.page_starts.append(self.page_last_id)
+            self.load_results_page(self.page_last_id)
+
+    def prev_results_page(self):
+        if len(self.page_starts) > 1:
+            self.page_starts.pop()
+            self.load_results_page(self.page_starts[-1])
+
+    def show_search_results(self, rows, count, announce=False, timing=None):
+        timing = timing or self.profiler.start("search_marks")
+        with timing.phase("widget_update"):
+            self.fill_results_page(rows, count)
+        timing.finish()
+
+        if not announce:
+            return
+        if rows:
+            self.marks_viewed = True
+            self.view_next_button.config(state=tk.NORMAL)  # Enable "Next" button
+            messagebox.showinfo("Success", "Records found and displayed!")
+        else:
+            self.marks_viewed = False
+            self.view_next_button.config(state=tk.DISABLED)  # Keep "Next" disabled
+            messagebox.showinfo("No Results", "No matching records found.")
+
+    def fill_results_page(self, rows, count):
+        if count is not None:
+            self.result_count = count
+        page_size = self.page_size.get()
+        self.page_has_more = len(rows) > page_size
+        rows = rows[:page_size]
+
+        # An editor left open would sit over a row that is about to go
+        self.close_cell_editor()
+        for item in self.tree.get_children():
+            self.tree.delete(item)
+
+        for row in rows:
+            row_id, student_id, student_name = row[:3]
+            marks = row[3:6]
+            tags = ()
+            # Unsaved edits survive paging back and forth
+            if row_id in self.pending_edits:
+                marks = self.pending_edits[row_id][2:]
+                tags = ("edited",)
+            total = sum(mark or 0 for mark in marks)  # Sum of coursework marks
+            self.tree.insert("", tk.END, iid=row_id, values=(student_id, student_name, *marks, total),
+                             tags=tags)
+
+        if rows:
+            self.page_last_id = rows[-1][0]
+            page = len(self.page_starts)
+            pages = max(-(-self.result_count // page_size), 1)
+            self.page_label.config(text=f"Page {page} of {pages} ({self.result_count} records)")
+        else:
+            self.page_label.config(text="")
+        self.prev_page_button.config(state=tk.NORMAL if len(self.page_starts) > 1 else tk.DISABLED)
+        self.next_page_button.config(state=tk.NORMAL if self.page_has_more else tk.DISABLED)
+
+    def export_file(self):
+        if SERVER_URL:
+            messagebox.showinfo("Export", "Exporting is done on the server: "
+                                          "run marks_cli.py export there.")
+            return
+        module_code = self.search_term or None
+        path = filedialog.asksaveasfilename(
+            title="Export Marks", defaultextension=".csv",
+            initialfile=f"{module_code or 'marks'}.csv",
+            filetypes=[("CSV files", "*.csv"), ("Excel files", "*.xlsx"),
+                       ("Parquet files", "*.parquet")])
+        if not path:
+            return
+
+        written = [0]
+        cancelled = threading.Event()
+
+        # The worker only records how far it got; the status bar is
+        # refreshed from the Tk thread. Raising here on Cancel stops the
+        # export and removes the partial file
+        def progress(count):
+            written[0] = count
+            if cancelled.is_set():
+                raise MarkExportError("Export cancelled")
+
+        def refresh_progress():
+            if not task.future.done():
+                self.status_label.config(text=f"Exporting... {written[0]} rows")
+                self.root.after(200, refresh_progress)
+
+        def exported(result):
+            message = f"Exported {result.written} rows to {os.path.basename(path)}."
+            if result.skipped:
+                message += (f"\n{result.skipped} rows were skipped because their date of entry "
+                            f"is not a YYYY-MM-DD date.")
+            messagebox.showinfo("Success", message)
+
+        def failed(e):
+            if isinstance(e, MarkExportError):
+                messagebox.showerror("Error", f"Export failed: {e}")
+            else:
+                messagebox.showerror("Error", f"An error occurred: {e}")
+
+        task = self.tasks.submit(export_marks, self.db, path, None, module_code,
+                                 self.export_from.get(), self.export_to.get(), BATCH_SIZE, progress,
+                                 on_done=exported, on_error=failed, interrupt=cancelled.set)
+        refresh_progress()
+
+    def edit_cell(self, event):
+        item = self.tree.identify_row(event.y)
+        column = self.tree.identify_column(event.x)  # "#1" is Student ID
+        column_index = int(column[1:]) - 1 if column else -1
+        if not item or column_index not in (2, 3, 4):
+            return  # Only the coursework marks are editable here
+
+        self.close_cell_editor()
+        x, y, width, height = self.tree.bbox(item, column)
+        editor = tk.Entry(self.tree, justify=tk.CENTER)
+        editor.insert(0, self.tree.set(item, column))
+        editor.select_range(0, tk.END)
+        editor.place(x=x, y=y, width=width, height=height)
+        editor.focus_set()
+        self.cell_editor = editor
+        self.cell_editor_target = (item, column_index)
+
+        def commit(event=None, quiet=False):
+            if self.cell_editor is editor:
+                self.commit_cell_editor(quiet)
+            return "break"
+
+        editor.bind("<Return>", commit)
+        editor.bind("<Tab>", commit)
+        editor.bind("<Escape>", lambda event: self.close_cell_editor())
+        # Clicking away keeps a valid value and drops an invalid one
+        editor.bind("<FocusOut>", lambda event: commit(quiet=True))
+
+    def close_cell_editor(self):
+        if self.cell_editor is not None:
+            editor, self.cell_editor = self.cell_editor, None
+            editor.destroy()
+
+    def commit_cell_editor(self, quiet=False):
+        # Buffers the value in the open editor, if any, and closes it.
+        # False if the value was not a valid mark
+        if self.cell_editor is None:
+            return True
+        value = self.cell_editor.get().strip()
+        item, column_index = self.cell_editor_target
+        self.close_cell_editor()
+        try:
+            mark = int(value)
+            if not 0 <= mark <= 100:
+                raise ValueError
+        except ValueError:
+            if not quiet:
+                messagebox.showerror("Error", "Marks must be whole numbers between 0 and 100.")
+            return False
+        self.buffer_edit(item, column_index, mark)
+        return True
+
+    def buffer_edit(self, item, column_index, mark):
+        # The row may have gone with a page change or a new search
+        if not self.tree.exists(item):
+            return
+        values = list(self.tree.item(item, "values"))
+        marks = [int(value) if value not in ("", "None") else None for value in values[2:5]]
+        marks[column_index - 2] = mark
+        values[2:5] = marks
+        values[5] = sum(value or 0 for value in marks)
+        self.tree.item(item, values=values, tags=("edited",))
+
+        # Keyed on the marks row id; the search term is the module the row belongs to
+        self.pending_edits[int(item)] = (values[0], self.search_term, *marks)
+        self.update_edit_controls()
+
+    def update_edit_controls(self):
+        count = len(self.pending_edits)
+        state = tk.NORMAL if count else tk.DISABLED
+        self.save_all_button.config(state=state)
+        self.discard_button.config(state=state)
+        self.edits_label.config(text=f"{count} unsaved change(s)" if count else "")
+
+    def save_all_edits(self):
+        # The value still being typed is saved along with the other edits
+        if not self.commit_cell_editor() or not self.pending_edits:
+            return
+
+        edits = dict(self.pending_edits)
+        # None keeps each row's stored date of entry
+        rows = [(student_id, module_code, None, *marks)
+                for student_id, module_code, *marks in edits.values()]
+        timing = self.profiler.start("save_all")
+
+        def saved(count):
+            timing.finish()
+            for row_id, edit in edits.items():
+                # Edits made while the save was running stay pending
+                if self.pending_edits.get(row_id) == edit:
+                    del self.pending_edits[row_id]
+                    if self.tree.exists(row_id):
+                        self.tree.item(row_id, tags=())
+            self.update_edit_controls()
+            messagebox.showinfo("Success", f"Saved marks for {count} student(s).")
+
+        def failed(e):
+            timing.finish()
+            messagebox.showerror("Error", f"Failed to save marks: {e}")
+
+        self.tasks.submit(timing.wrap(self.db.update_marks_many, "query"), rows,
+                          on_done=saved, on_error=failed)
+
+    def discard_edits(self):
+        self.close_cell_editor()
+        self.pending_edits.clear()
+        self.update_edit_controls()
+        self.load_results_page(self.page_starts[-1])
+
     def next_page3(self):
         if not self.marks_viewed:
             messagebox.showerror("Error", "You must view the marks before proceeding!")
@@ -322,9 +1127,13 @@ class MarkRegistrationSystem:
         self.show_update_marks()
 
     def show_update_marks(self):
-        self.clear_content()
+        self.show_page("update_marks", self.build_update_marks)
         self.marks_updated = False
+        self.update_next_button.config(state=tk.DISABLED)
+        if self.student_marks_id:
+            self.load_student_marks(self.student_marks_id)
 
+    def build_update_marks(self):
         tk.Label(self.current_page, text="Modify Marks",
                  font=("Arial", 20), pady=30).pack()
 
@@ -345,10 +1154,28 @@ class MarkRegistrationSystem:
         tk.Button(button_frame, text="Delete", command=self.delete_record,
                   bg="red", fg="black").pack(side=tk.LEFT, padx=10)
 
-        self.next_button = tk.Button(button_frame, text="Next", command=self.go_to_visualization,
-                                     bg="#4CAF50", fg="white")
-        self.next_button.pack(side=tk.LEFT, padx=10)
-        self.next_button.config(state=tk.DISABLED)
+        self.update_next_button = tk.Button(button_frame, text="Next", command=self.go_to_visualization,
+                                            bg="#4CAF50", fg="white")
+        self.update_next_button.pack(side=tk.LEFT, padx=10)
+        self.update_next_button.config(state=tk.DISABLED)
+
+        # Every module the searched student has marks for. Update and Delete
+        # act on the selected rows (Ctrl/Shift-click selects several), or on
+        # the Module Code above when nothing is selected. Typing another
+        # Student ID or Module Code clears a selection it no longer matches
+        columns = ("Module Code", "Module Name", "Coursework 1", "Coursework 2", "Coursework 3",
+                   "Date of Entry")
+        self.student_marks_tree = ttk.Treeview(self.current_page, columns=columns, show="headings",
+                                               selectmode="extended", height=6)
+        for col in columns:
+            self.student_marks_tree.heading(col, text=col)
+            self.student_marks_tree.column(col, width=120)
+        self.student_marks_tree.pack(fill=tk.X, padx=20)
+        self.student_marks_tree.bind("<<TreeviewSelect>>", self.load_selected_mark)
+        # The student shown in the table, re-read when the page is shown again
+        self.student_marks_id = None
+        for variable in (self.student_id, self.module_code):
+            variable.trace_add("write", lambda *args: self.check_marks_selection())
 
     def create_form_entries(self, label_text, variable):
         tk.Label(self.current_page, text=label_text, font=("Arial", 12)).pack(pady=5)
@@ -359,100 +1186,165 @@ class MarkRegistrationSystem:
         if not student_id:
             messagebox.showerror("Error", "Please enter a Student ID to search!")
             return
+        self.load_student_marks(student_id, announce=True)
 
-        try:
-            conn = sqlite3.connect('marks.db')
-            cursor = conn.cursor()
-
-            cursor.execute('''
-            SELECT * FROM marks WHERE student_id = ?
-            ''', (student_id,))
-
-            result = cursor.fetchone()
-            conn.close()
-
-            if result:
-                self.module_code.set(result[1])
-                self.date_of_entry.set(result[9])
-                self.coursework_1_mark.set(result[3])
-                self.coursework_2_mark.set(result[4])
-                self.coursework_3_mark.set(result[5])
-                messagebox.showinfo("Success", "Student record found and loaded.")
+    def load_student_marks(self, student_id, announce=False):
+        tree = self.student_marks_tree
+        module_code = self.module_code.get().strip().lower()
+
+        def loaded(rows):
+            self.student_marks_id = student_id
+            for item in tree.get_children():
+                tree.delete(item)
+            items = [tree.insert("", tk.END, values=row) for row in rows]
+
+            # Only the module in the form is selected; with none, nothing is
+            selected = [item for item, row in zip(items, rows) if row[0].lower() == module_code]
+            tree.selection_set(selected)
+
+            if not announce:
+                return
+            if rows:
+                messagebox.showinfo("Success", f"{len(rows)} module record(s) found for this student.")
             else:
                 messagebox.showinfo("Not Found", "No matching record found.")
 
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to search database: {e}")
+        self.submit_read(self.db.marks_for_student, student_id, on_done=loaded,
+                          on_error=lambda e: messagebox.showerror("Error", f"Failed to search database: {e}"),
+                          key="search_mark")
+
+    def load_selected_mark(self, event=None):
+        selected = self.student_marks_tree.selection()
+        if len(selected) != 1:
+            return  # Several rows: the form holds the marks to apply to all of them
+        module_code, _, coursework_1, coursework_2, coursework_3, date_of_entry = \
+            self.student_marks_tree.item(selected[0], "values")
+        self.module_code.set(module_code)
+        self.date_of_entry.set(date_of_entry)
+        self.coursework_1_mark.set(coursework_1)
+        self.coursework_2_mark.set(coursework_2)
+        self.coursework_3_mark.set(coursework_3)
+
+    def marks_selection(self):
+        # Module codes of the selected rows, as long as they belong to the
+        # Student ID in the form and include its Module Code (if any)
+        selected = self.student_marks_tree.selection()
+        if not selected or self.student_marks_id != self.student_id.get().strip():
+            return []
+        module_codes = [self.student_marks_tree.set(item, "Module Code") for item in selected]
+        module_code = self.module_code.get().strip().lower()
+        if module_code and module_code not in [code.lower() for code in module_codes]:
+            return []
+        return module_codes
+
+    def check_marks_selection(self):
+        selected = self.student_marks_tree.selection()
+        if selected and not self.marks_selection():
+            self.student_marks_tree.selection_remove(selected)
+
+    def selected_module_codes(self):
+        module_codes = self.marks_selection()
+        if module_codes:
+            return module_codes
+        module_code = self.module_code.get().strip()
+        return [module_code] if module_code else []
 
     def update_marks(self):
         student_id = self.student_id.get().strip()
         if not student_id:
             messagebox.showerror("Error", "Please enter a Student ID to update!")
             return
+        module_codes = self.selected_module_codes()
+        if not module_codes:
+            messagebox.showerror("Error", "Please enter or select a Module Code to update!")
+            return
 
         try:
-            conn = sqlite3.connect('marks.db')
-            cursor = conn.cursor()
-
-            cursor.execute('''
-            UPDATE marks
-            SET module_code = ?, date_of_entry = ?,
-                coursework_1_mark = ?, coursework_2_mark = ?, coursework_3_mark = ?
-            WHERE student_id = ?
-            ''', (
-                self.module_code.get(), self.date_of_entry.get(),
-                self.coursework_1_mark.get(), self.coursework_2_mark.get(),
-                self.coursework_3_mark.get(), student_id
-            ))
-
-            if cursor.rowcount > 0:
-                conn.commit()
+            # Form values are read here, on the Tk thread, before handing off
+            marks = (self.date_of_entry.get(), self.coursework_1_mark.get(),
+                     self.coursework_2_mark.get(), self.coursework_3_mark.get())
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to update marks: {e}")
+            return
+        rows = [(student_id, module_code) + marks for module_code in module_codes]
+
+        timing = self.profiler.start("update_marks")
+
+        def updated(count):
+            timing.finish()
+            if count > 0:
                 self.marks_updated = True
-                messagebox.showinfo("Success", "Marks updated successfully!")
-                self.next_button.config(state=tk.NORMAL)  # Enable Next button
+                self.load_student_marks(student_id)
+                messagebox.showinfo("Success", f"Marks updated successfully for {count} module(s)!")
+                self.update_next_button.config(state=tk.NORMAL)  # Enable Next button
             else:
-                messagebox.showwarning("Not Found", "Student ID not found in the database.")
-
-            conn.close()
+                messagebox.showwarning("Not Found", "No marks found for this student and module.")
 
-        except Exception as e:
+        def failed(e):
+            timing.finish()
             messagebox.showerror("Error", f"Failed to update marks: {e}")
 
+        self.tasks.submit(timing.wrap(self.db.update_marks_many, "query"), rows,
+                          on_done=updated, on_error=failed)
+
     def delete_record(self):
         student_id = self.student_id.get().strip()
         if not student_id:
             messagebox.showerror("Error", "Please enter a Student ID to delete!")
             return
+        module_codes = self.selected_module_codes()
+        if not module_codes:
+            messagebox.showerror("Error", "Please enter or select a Module Code to delete!")
+            return
+        if not messagebox.askyesno("Confirm Delete",
+                                   f"Delete marks for student {student_id} in {', '.join(module_codes)}?"):
+            return
 
-        try:
-            conn = sqlite3.connect('marks.db')
-            cursor = conn.cursor()
-
-            cursor.execute('''
-                DELETE FROM marks WHERE student_id = ?
-                ''', (student_id,))
+        timing = self.profiler.start("delete_record")
 
-            if cursor.rowcount > 0:
-                conn.commit()
-                messagebox.showinfo("Success", f"Student ID {student_id} deleted successfully!")
+        def deleted(count):
+            timing.finish()
+            if count > 0:
+                self.load_student_marks(student_id)
+                messagebox.showinfo("Success", f"Deleted {count} mark record(s) for student ID {student_id}!")
                 # If deleting, disable the next button as there's nothing to visualize after delete
-                self.next_button.config(state=tk.DISABLED)
+                self.update_next_button.config(state=tk.DISABLED)
             else:
-                messagebox.showwarning("Not Found", "Student ID not found in the database.")
+                messagebox.showwarning("Not Found", "No marks found for this student and module.")
 
-            conn.close()
-
-        except Exception as e:
+        def failed(e):
+            timing.finish()
             messagebox.showerror("Error", f"Failed to delete record: {e}")
 
+        self.tasks.submit(timing.wrap(self.db.delete_marks, "query"),
+                          [(student_id, module_code) for module_code in module_codes],
+                          on_done=deleted, on_error=failed)
+
     def go_to_visualization(self):
         if self.marks_updated:
             self.show_visualisation()  # Call your visualization page function
         else:
             messagebox.showwarning("Warning", "Please update the marks before proceeding to the visualization.")
 
-    def show_visualisation(self):
-        self.clear_content()
+    def show_visualisation(self, module_code=None):
+        self.show_page("visualisation", self.build_visualisation)
+
+        # Opened from the module overview
+        if module_code:
+            self.chart_code_entry.delete(0, tk.END)
+            self.chart_code_entry.insert(0, module_code)
+            self.load_chart(module_code)
+        elif self.chart_module_code:
+            # Only redrawn if the module's marks changed since it was charted
+            self.load_chart(self.chart_module_code, keep_graph=True)
+
+    def build_visualisation(self):
+        import_started = time.perf_counter()
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        from charts import ModuleChart
+        if STARTUP_TIMING and not self.plotting_loaded:
+            print(f"deferred {'matplotlib':<10} {(time.perf_counter() - import_started) * 1000:8.1f} ms")
+        self.plotting_loaded = True
 
         # Create main container
         viz_frame = tk.Frame(self.current_page)
@@ -464,179 +1356,139 @@ class MarkRegistrationSystem:
 
         tk.Label(input_frame, text="Enter Module Code:",
                  font=("Arial", 14)).pack(side=tk.LEFT, padx=5)
-        module_code_entry = tk.Entry(input_frame, font=("Arial", 14))
-        module_code_entry.pack(side=tk.LEFT, padx=5)
+        self.chart_code_entry = tk.Entry(input_frame, font=("Arial", 14))
+        self.chart_code_entry.pack(side=tk.LEFT, padx=5)
 
         # Initialize graph index
         self.current_graph_index = 0
-
-        def get_module_data(module_code):
-            try:
-                conn = sqlite3.connect('marks.db')
-                cursor = conn.cursor()
-
-                cursor.execute('''
-                    SELECT student_name, coursework_1_mark, coursework_2_mark, coursework_3_mark
-                    FROM marks
-                    WHERE module_code = ?
-                    ''', (module_code,))
-
-                results = cursor.fetchall()
-                conn.close()
-
-                if not results:
-                    return None
-
-                return [{
-                    'Student Name': row[0],
-                    'Coursework 1 Mark': row[1],
-                    'Coursework 2 Mark': row[2],
-                    'Coursework 3 Mark': row[3]
-                } for row in results]
-
-            except Exception as e:
-                messagebox.showerror("Error", f"Failed to fetch data: {e}")
-                return None
-
-        def calculate_grade_distribution(total_marks):
-            grades = {
-                'A': 0,  # 70-100
-                'B': 0,  # 60-69
-                'C': 0,  # 50-59
-                'D': 0,  # 40-49
-                'F': 0  # 0-39
-            }
-
-            for mark in total_marks:
-                if mark >= 70:
-                    grades['A'] += 1
-                elif mark >= 60:
-                    grades['B'] += 1
-                elif mark >= 50:
-                    grades['C'] += 1
-                elif mark >= 40:
-                    grades['D'] += 1
-                else:
-                    grades['F'] += 1
-
-            return grades
-
-        def display_graph(module_data, graph_type):
-            # Clear previous graph if exists
-            for widget in graph_frame.winfo_children():
-                widget.destroy()
-
-            if not module_data:
-                messagebox.showerror("Error", "No data available for visualization")
-                return
-
-            # Extract data
-            student_names = [row['Student Name'] for row in module_data]
-            coursework1 = [float(row['Coursework 1 Mark']) for row in module_data]
-            coursework2 = [float(row['Coursework 2 Mark']) for row in module_data]
-            coursework3 = [float(row['Coursework 3 Mark']) for row in module_data]
-            total_marks = [sum(marks) for marks in zip(coursework1, coursework2, coursework3)]
-
-            # Create figure
-            fig = plt.Figure(figsize=(10, 6), dpi=100)
-            ax = fig.add_subplot(111)
-
-            if graph_type == 'bar':
-                ax.bar(student_names, total_marks, color='blue')
-                ax.set_title('Total Marks by Student')
-                ax.set_xlabel('Student Name')
-                ax.set_ylabel('Total Marks')
-                plt.setp(ax.get_xticklabels(), rotation=45, ha='right')
-
-            elif graph_type == 'pie':
-                grades = calculate_grade_distribution(total_marks)
-                labels = []
-                sizes = []
-                colors = ['#2ecc71', '#3498db', '#f1c40f', '#e67e22', '#e74c3c']
-
-                for grade, count in grades.items():
-                    if count > 0:
-                        labels.append(f'Grade {grade} ({count})')
-                        sizes.append(count)
-
-                if sum(sizes) > 0:
-                    patches, texts, autotexts = ax.pie(sizes,
-                                                       labels=labels,
-                                                       colors=colors[:len(sizes)],
-                                                       autopct='%1.1f%%',
-                                                       startangle=90)
-                    ax.set_title('Grade Distribution')
-                    ax.axis('equal')
-                else:
-                    ax.text(0.5, 0.5, 'No grade data available',
-                            horizontalalignment='center',
-                            verticalalignment='center')
-
-            elif graph_type == 'scatter':
-                ax.scatter(range(len(student_names)), total_marks, color='orange')
-                ax.set_xticks(range(len(student_names)))
-                ax.set_xticklabels(student_names)
-                ax.set_title('Marks Distribution')
-                ax.set_xlabel('Student Name')
-                ax.set_ylabel('Total Marks')
-                plt.setp(ax.get_xticklabels(), rotation=45, ha='right')
-
-            elif graph_type == 'line':
-                ax.plot(student_names, total_marks, marker='o', color='yellow')
-                ax.set_title('Marks Trend')
-                ax.set_xlabel('Student Name')
-                ax.set_ylabel('Total Marks')
-                plt.setp(ax.get_xticklabels(), rotation=45, ha='right')
-
-            fig.tight_layout()
-
-            # Embed in tkinter window
-            canvas = FigureCanvasTkAgg(fig, master=graph_frame)
-            canvas.draw()
-            canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
-
-        def submit():
-            module_code = module_code_entry.get()
-            if not module_code:
-                messagebox.showerror("Error", "Please enter a module code")
-                return
-
-            module_data = get_module_data(module_code)
-            if not module_data:
-                messagebox.showerror("Error", "No data found for the provided module code")
-                return
-
-            # Display initial graph
-            display_graph(module_data, 'bar')
-
-            # Enable next graph button
-            next_button.config(state=tk.NORMAL)
-
-            # Store data for later use
-            next_button.module_data = module_data
-
-        def next_graph():
-            graph_types = ['bar', 'line', 'scatter', 'pie']
-            self.current_graph_index = (self.current_graph_index + 1) % len(graph_types)
-            display_graph(next_button.module_data, graph_types[self.current_graph_index])
+        self.chart_module_code = None
 
         # Create submit button
-        tk.Button(input_frame, text="Submit", command=submit,
+        tk.Button(input_frame, text="Submit", command=self.submit_chart,
                   bg="#00bcd4", fg="black", font=("Arial", 12)).pack(side=tk.LEFT, padx=5)
 
         # Create graph frame
         graph_frame = tk.Frame(viz_frame)
         graph_frame.pack(fill=tk.BOTH, expand=True, pady=10)
 
+        # One figure and canvas for the lifetime of this page; every chart
+        # switch redraws into them instead of rebuilding widgets. The canvas
+        # is packed on first use
+        self.chart = ModuleChart()
+        self.chart_canvas = FigureCanvasTkAgg(self.chart.figure, master=graph_frame)
+
         # Create next graph button (initially disabled)
-        next_button = tk.Button(input_frame, text="Next Graph Type", command=next_graph,
-                                bg="#4CAF50", fg="white", font=("Arial", 12), state=tk.DISABLED)
-        next_button.pack(side=tk.LEFT, padx=5)
+        self.next_graph_button = tk.Button(input_frame, text="Next Graph Type", command=self.next_graph,
+                                           bg="#4CAF50", fg="white", font=("Arial", 12), state=tk.DISABLED)
+        self.next_graph_button.pack(side=tk.LEFT, padx=5)
 
         # Create close button
         tk.Button(input_frame, text="Close", command=self.show_home,
                   bg="#f44336", fg="black", font=("Arial", 12)).pack(side=tk.LEFT, pady=10)
 
+    def display_graph(self, chart_data, graph_type, timing=None):
+        if not chart_data:
+            messagebox.showerror("Error", "No data available for visualization")
+            return
+
+        timing = timing or self.profiler.start("display_graph")
+        with timing.phase("render"):
+            if chart_data is not self.chart.data:
+                self.chart.set_data(chart_data)
+            self.chart.show(graph_type)
+
+            # Embed in tkinter window on first use
+            canvas_widget = self.chart_canvas.get_tk_widget()
+            if not canvas_widget.winfo_manager():
+                canvas_widget.pack(fill=tk.BOTH, expand=True)
+            self.chart_canvas.draw()
+        timing.finish()
+
+    def submit_chart(self):
+        module_code = self.chart_code_entry.get()
+        if not module_code:
+            messagebox.showerror("Error", "Please enter a module code")
+            return
+        self.load_chart(module_code)
+
+    def load_chart(self, module_code, keep_graph=False):
+        from charts import GRAPH_TYPES
+        timing = self.profiler.start("display_graph")
+
+        def loaded(chart_data):
+            if not chart_data:
+                timing.finish()
+                if keep_graph:
+                    self.chart_module_code = None  # Its marks have all been deleted
+                else:
+                    messagebox.showerror("Error", "No data found for the provided module code")
+                return
+
+            if keep_graph and chart_data == self.chart.data:
+                # chart_data is rebuilt on every call, so compare contents:
+                # an unchanged module keeps the chart that is already drawn
+                timing.finish()
+                return
+
+            self.chart_module_code = module_code
+            if not keep_graph:
+                self.current_graph_index = 0
+            # Display initial graph
+            self.display_graph(chart_data, GRAPH_TYPES[self.current_graph_index], timing)
+
+            # Enable next graph button
+            self.next_graph_button.config(state=tk.NORMAL)
+
+        def failed(e):
+            timing.finish()
+            messagebox.showerror("Error", f"Failed to fetch data: {e}")
+
+        self.submit_read(timing.wrap(self.db.chart_data), module_code, on_done=loaded,
+                          on_error=failed, key="visualisation")
+
+    def next_graph(self):
+        from charts import GRAPH_TYPES
+        self.current_graph_index = (self.current_graph_index + 1) % len(GRAPH_TYPES)
+        self.display_graph(self.chart.data, GRAPH_TYPES[self.current_graph_index])
+
+    def show_module_overview(self):
+        self.show_page("module_overview", self.build_module_overview)
+
+        # One summary row per module, so this stays fast however many marks there are
+        self.submit_read(self.db.module_summaries, on_done=self.fill_module_overview,
+                          on_error=lambda e: messagebox.showerror("Error", f"Failed to load modules: {e}"),
+                          key="module_overview")
+
+    def build_module_overview(self):
+        tk.Label(self.current_page, text="Module Overview", font=("Arial", 20, "bold")).pack(pady=10)
+        tk.Label(self.current_page, text="Double-click a module to chart it.",
+                 font=("Arial", 12)).pack()
+
+        columns = ("Module Code", "Module Name", "Students", "Average", "Min", "Max",
+                   "CW1 Avg", "CW2 Avg", "CW3 Avg") + tuple(f"Grade {grade}" for grade, _ in GRADE_BANDS)
+        self.overview_tree = ttk.Treeview(self.current_page, columns=columns, show="headings")
+        for col in columns:
+            self.overview_tree.heading(col, text=col)
+            self.overview_tree.column(col, width=150 if col in ("Module Code", "Module Name") else 80)
+        self.overview_tree.pack(fill=tk.BOTH, expand=True, padx=20, pady=10)
+        self.overview_tree.bind("<Double-1>", self.open_overview_chart)
+
+    def fill_module_overview(self, summaries):
+        tree = self.overview_tree
+        for item in tree.get_children():
+            tree.delete(item)
+        for summary in summaries:
+            tree.insert("", tk.END, values=(
+                summary['module_code'], summary['module_name'], summary['count'],
+                f"{summary['mean']:.1f}", summary['min'], summary['max'],
+                *(f"{mean:.1f}" for mean in summary['coursework_means']),
+                *summary['grades'].values()))
+
+    def open_overview_chart(self, event):
+        selected = self.overview_tree.focus()
+        if selected:
+            self.show_visualisation(self.overview_tree.set(selected, "Module Code"))
+
 
 if __name__ == "__main__":
     root = tk.Tk()
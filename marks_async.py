@@ -0,0 +1,132 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from marks_db import MarksDatabase
+
+# asyncio front end for the marks store. SQLite calls are blocking, so each
+# one runs on a small, fixed thread pool (every pool thread keeps its own
+# connection through MarksDatabase); coroutines only wait on them. Many
+# concurrent queries therefore cost tasks, not threads:
+#
+#   async with AsyncMarksDatabase('marks.db') as db:
+#       aggregates = await db.aggregates_for_modules(await db.module_codes())
+#
+# The same wrapper works over marks_client.MarksClient. Code without a
+# running loop (the Tk app, scripts) uses EventLoopThread as the bridge:
+#
+#   loop = EventLoopThread()
+#   future = loop.submit(db.chart_data('CS101'))   # concurrent.futures.Future
+#   tasks.track(future, on_done=...)               # task_runner.TaskRunner
+
+
+class AsyncMarksDatabase:
+    def __init__(self, db=None, max_workers=4):
+        # db is a MarksDatabase/MarksClient to share, or a path to open
+        self.owns_db = db is None or isinstance(db, str)
+        if self.owns_db:
+            db = MarksDatabase(db) if db else MarksDatabase()
+        self.db = db
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix='marks-async')
+
+    async def __aenter__(self):
+        await self.migrate()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def _run(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(fn, *args))
+
+    async def migrate(self):
+        return await self._run(self.db.migrate)
+
+    async def close(self):
+        # A shared database is left open for its owner
+        if self.owns_db:
+            await self._run(self.db.close)
+        self._executor.shutdown(wait=True)
+
+    # Writes
+
+    async def insert_mark(self, module_code, module_name, coursework_1_mark,
+                          coursework_2_mark, coursework_3_mark, student_id,
+                          student_name, gender, date_of_entry):
+        return await self._run(self.db.insert_mark, module_code, module_name,
+                               coursework_1_mark, coursework_2_mark, coursework_3_mark,
+                               student_id, student_name, gender, date_of_entry)
+
+    async def insert_marks_many(self, rows):
+        return await self._run(self.db.insert_marks_many, list(rows))
+
+    async def update_mark(self, student_id, module_code, date_of_entry,
+                          coursework_1_mark, coursework_2_mark, coursework_3_mark):
+        return await self._run(self.db.update_mark, student_id, module_code, date_of_entry,
+                               coursework_1_mark, coursework_2_mark, coursework_3_mark)
+
+    async def update_marks_many(self, rows):
+        return await self._run(self.db.update_marks_many, list(rows))
+
+    async def delete_marks(self, keys):
+        return await self._run(self.db.delete_marks, list(keys))
+
+    # Reads
+
+    async def marks_for_module(self, module_code):
+        return await self._run(self.db.marks_for_module, module_code)
+
+    async def marks_page_for_module(self, module_code, after_id=0, limit=100):
+        return await self._run(self.db.marks_page_for_module, module_code, after_id, limit)
+
+    async def count_marks_for_module(self, module_code):
+        return await self._run(self.db.count_marks_for_module, module_code)
+
+    async def marks_for_student(self, student_id):
+        return await self._run(self.db.marks_for_student, student_id)
+
+    async def search(self, text, limit=50):
+        return await self._run(self.db.search, text, limit)
+
+    async def module_codes(self):
+        return await self._run(self.db.module_codes)
+
+    async def module_aggregates(self, module_code):
+        return await self._run(self.db.module_aggregates, module_code)
+
+    async def module_summaries(self):
+        return await self._run(self.db.module_summaries)
+
+    async def chart_data(self, module_code):
+        return await self._run(self.db.chart_data, module_code)
+
+    async def aggregates_for_modules(self, module_codes):
+        # Fans out one query per module; the pool size bounds how many run
+        # at once. Returns {module_code: aggregates or None}
+        module_codes = list(module_codes)
+        results = await asyncio.gather(*(self.module_aggregates(code) for code in module_codes))
+        return dict(zip(module_codes, results))
+
+
+class EventLoopThread:
+    # An asyncio loop on a daemon thread, for callers that are not coroutines
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name='marks-loop',
+                                        daemon=True)
+        self._thread.start()
+
+    def submit(self, coroutine):
+        # Returns a concurrent.futures.Future; cancelling it cancels the task
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+    def run(self, coroutine):
+        return self.submit(coroutine).result()
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self.loop.close()
@@ -0,0 +1,239 @@
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from marks_db import MarksDatabase, insert_marks
+
+# Reproducible timings for the database and chart hot paths, run headlessly
+# against a synthetic marks.db:
+#
+#   python marks_benchmark.py --rows 100000 --modules 500 -o bench.jsonl
+#   python marks_benchmark.py --rows 100000 --modules 500 --compare bench.jsonl
+#
+# Each run appends one JSON line per operation, so results from different
+# commits or machines can be compared side by side. An existing --db is
+# copied first: the write benchmarks insert and update marks, and they only
+# ever touch the copy.
+
+FIRST_NAMES = ('Amina', 'Ben', 'Chloe', 'Dev', 'Ewa', 'Farah', 'George', 'Hana',
+               'Ivan', 'Jade', 'Kofi', 'Lena', 'Musa', 'Nora', 'Omar', 'Priya')
+LAST_NAMES = ('Ali', 'Brown', 'Chen', 'Diaz', 'Evans', 'Fofana', 'Garcia', 'Hughes',
+              'Iqbal', 'Jones', 'Khan', 'Lopez', 'Mensah', 'Nowak', 'Okafor', 'Patel')
+
+
+def synthesize(path, rows, modules, seed=0, batch_size=10000):
+    rng = random.Random(seed)
+    db = MarksDatabase(path)
+    db.migrate()
+
+    def generate():
+        for i in range(rows):
+            module = rng.randrange(modules)
+            yield (
+                f'MOD{module:04d}', f'Module {module}',
+                rng.randint(0, 40), rng.randint(0, 30), rng.randint(0, 30),
+                f'S{i:07d}', f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}',
+                rng.choice(('Male', 'Female')), '2025-09-01'
+            )
+
+    with db.transaction() as cursor:
+        batch = []
+        for row in generate():
+            batch.append(row)
+            if len(batch) >= batch_size:
+                insert_marks(cursor, batch)
+                batch = []
+        insert_marks(cursor, batch)
+    db.close()
+
+
+def timed(fn, repeat, setup=None):
+    samples = []
+    for i in range(repeat):
+        if setup:
+            setup(i)
+        started = time.perf_counter()
+        fn(i)
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def summarise(samples):
+    samples = sorted(samples)
+    return {
+        'runs': len(samples),
+        'min_ms': round(samples[0] * 1000, 3),
+        'median_ms': round(statistics.median(samples) * 1000, 3),
+        'p95_ms': round(samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000, 3),
+        'max_ms': round(samples[-1] * 1000, 3),
+    }
+
+
+def copy_database(source, path):
+    # The backup API also picks up anything still in source's WAL file
+    src = sqlite3.connect(source)
+    dst = sqlite3.connect(path)
+    try:
+        src.backup(dst)
+    finally:
+        dst.close()
+        src.close()
+
+
+def database_size(path):
+    # (marks rows, modules) actually in the database being benchmarked; an
+    # older copy is migrated first so the counts match what is timed
+    db = MarksDatabase(path)
+    try:
+        db.migrate()
+        return (db.conn.execute("SELECT COUNT(*) FROM marks").fetchone()[0],
+                db.conn.execute("SELECT COUNT(*) FROM modules").fetchone()[0])
+    finally:
+        db.close()
+
+
+def run_benchmarks(path, repeat, seed=0):
+    rng = random.Random(seed + 1)
+    db = MarksDatabase(path)
+    db.migrate()
+    module_codes = db.module_codes()
+    if not module_codes:
+        db.close()
+        raise SystemExit(f"{path} has no marks to benchmark")
+    codes = [rng.choice(module_codes) for _ in range(repeat)]
+    enrolments = db.conn.execute(
+        "SELECT s.student_id, m.module_code FROM marks mk"
+        " JOIN students s ON s.id = mk.student_ref JOIN modules m ON m.id = mk.module_ref"
+        " ORDER BY random() LIMIT ?", (repeat,)).fetchall()
+    enrolments += enrolments[:1] * (repeat - len(enrolments))
+
+    # Cached reads would only measure the LRU, so each timed call starts cold
+    def cold(i):
+        db.cache.clear()
+
+    results = {}
+
+    results['search_marks'] = timed(
+        lambda i: (db.marks_page_for_module(codes[i], 0, 101),
+                   db.count_marks_for_module(codes[i])),
+        repeat, cold)
+    results['search_marks_all_rows'] = timed(
+        lambda i: db.marks_for_module(codes[i]), repeat, cold)
+    results['search_marks_cached'] = timed(
+        lambda i: db.marks_page_for_module(codes[0], 0, 101), repeat)
+    results['submit_marks'] = timed(
+        lambda i: db.insert_mark(codes[i], 'Benchmark', 50, 20, 10, f'B{i:07d}',
+                                 'Bench Mark', 'Female', '2025-09-02'),
+        repeat)
+    results['update_marks'] = timed(
+        lambda i: db.update_mark(*enrolments[i], '2025-09-03', 40, 20, 10),
+        repeat)
+    results['get_module_data'] = timed(lambda i: db.chart_data(codes[i]), repeat, cold)
+
+    try:
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from charts import GRAPH_TYPES, ModuleChart
+    except ImportError:
+        print("matplotlib not installed; skipping display_graph", file=sys.stderr)
+    else:
+        chart = ModuleChart()
+        canvas = FigureCanvasAgg(chart.figure)
+        datasets = [db.chart_data(code) for code in codes]
+
+        def render(i):
+            chart.set_data(datasets[i])
+            for graph_type in GRAPH_TYPES:
+                chart.show(graph_type)
+                canvas.draw()
+
+        results['display_graph'] = timed(render, repeat)
+
+    db.close()
+    return {name: summarise(samples) for name, samples in results.items()}
+
+
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                                text=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        commit = ''
+    return {
+        'commit': commit,
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'machine': platform.machine(),
+        'system': platform.system(),
+    }
+
+
+def load_results(path):
+    # Latest result per (operation, rows, modules) from a previous run file
+    latest = {}
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                latest[(record['operation'], record['rows'], record['modules'])] = record
+    return latest
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='marks_benchmark',
+                                     description="Benchmark the marks database and chart hot paths")
+    parser.add_argument('--rows', type=int, default=10000, help="marks rows to synthesize")
+    parser.add_argument('--modules', type=int, default=100, help="distinct module codes")
+    parser.add_argument('--repeat', type=int, default=20, help="timed runs per operation")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--db', help="benchmark a copy of this database instead of a synthetic one")
+    parser.add_argument('-o', '--output', help="append JSON lines results to this file")
+    parser.add_argument('--compare', help="JSON lines file from an earlier run to compare against")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'marks.db')
+        if args.db:
+            if not os.path.exists(args.db):
+                parser.error(f"database not found: {args.db}")
+            copy_database(args.db, path)
+        else:
+            started = time.perf_counter()
+            synthesize(path, args.rows, args.modules, args.seed)
+            print(f"synthesized {args.rows} rows / {args.modules} modules "
+                  f"in {time.perf_counter() - started:.1f} s", file=sys.stderr)
+
+        # Recorded from the database itself, so --compare matches runs on
+        # databases of the same size
+        rows, modules = database_size(path)
+        results = run_benchmarks(path, args.repeat, args.seed)
+
+    baseline = load_results(args.compare) if args.compare else {}
+    meta = dict(environment(), timestamp=time.strftime('%Y-%m-%dT%H:%M:%S'),
+                rows=rows, modules=modules)
+    records = [dict(meta, operation=name, **stats) for name, stats in results.items()]
+
+    print(f"{'operation':<24}{'median ms':>12}{'p95 ms':>12}{'vs baseline':>14}")
+    for record in records:
+        previous = baseline.get((record['operation'], record['rows'], record['modules']))
+        change = ''
+        if previous and previous['median_ms']:
+            change = f"{record['median_ms'] / previous['median_ms']:.2f}x"
+        print(f"{record['operation']:<24}{record['median_ms']:>12.3f}{record['p95_ms']:>12.3f}{change:>14}")
+
+    if args.output:
+        with open(args.output, 'a', encoding='utf-8') as f:
+            for record in records:
+                f.write(json.dumps(record) + '\n')
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
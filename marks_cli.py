@@ -0,0 +1,221 @@
+import argparse
+import asyncio
+import csv
+import sqlite3
+import sys
+
+from marks_async import AsyncMarksDatabase
+from marks_db import DB_PATH, EXPORT_COLUMNS, GRADE_BANDS, MarksDatabase
+from marks_export import FORMATS, MarkExportError, export_marks, parse_date
+from marks_import import MARK_COLUMNS, MarkImportError, import_marks, validate_mark
+
+# Headless entry point sharing MarksDatabase with the Tk app. Nothing here
+# imports tkinter or matplotlib, so it runs on servers and in cron jobs:
+#
+#   python marks_cli.py import intake.csv
+#   python marks_cli.py query CS101
+#   python marks_cli.py export --module CS101 -o cs101.csv
+#   python marks_cli.py export --from 2025-09-01 -o weekly.parquet
+#   python marks_cli.py report
+#   python marks_cli.py charts -o reports --format png pdf --workers 8
+#   python marks_cli.py bulk-update moderated.csv
+
+UPDATE_COLUMNS = ('student_id', 'module_code', 'date_of_entry',
+                  'coursework_1_mark', 'coursework_2_mark', 'coursework_3_mark')
+REPORT_COLUMNS = ('module_code', 'count', 'mean', 'min', 'max') + tuple(
+    grade for grade, _ in GRADE_BANDS)
+
+
+def _open_output(path):
+    if not path or path == '-':
+        return sys.stdout
+    return open(path, 'w', newline='', encoding='utf-8')
+
+
+def cmd_import(db, args):
+    result = import_marks(db, args.path, chunk_size=args.chunk_size)
+    print(f"Imported {result.imported} rows, rejected {result.rejected}.")
+    for error in result.errors:
+        print(f"  {error}", file=sys.stderr)
+    return 1 if result.rejected and args.strict else 0
+
+
+def cmd_query(db, args):
+    rows = db.marks_for_module(args.module_code)
+    if not rows:
+        print("No matching records found.", file=sys.stderr)
+        return 1
+
+    writer = csv.writer(sys.stdout)
+    writer.writerow(('student_id', 'student_name', 'coursework_1_mark',
+                     'coursework_2_mark', 'coursework_3_mark', 'total'))
+    for row in rows:
+        writer.writerow((*row, sum(mark or 0 for mark in row[2:5])))
+    return 0
+
+
+def cmd_export(db, args):
+    if args.output and args.output != '-':
+        result = export_marks(db, args.output, args.format, args.module,
+                              args.date_from, args.date_to)
+        print(f"Exported {result.written} rows to {args.output}.", file=sys.stderr)
+        skipped = result.skipped
+    else:
+        # stdout is always CSV
+        date_from, date_to = parse_date(args.date_from), parse_date(args.date_to)
+        skipped = db.count_undated_marks(args.module) if date_from or date_to else 0
+        writer = csv.writer(sys.stdout)
+        writer.writerow(EXPORT_COLUMNS)
+        writer.writerows(db.iter_marks(args.module, date_from=date_from, date_to=date_to))
+    if skipped:
+        print(f"Skipped {skipped} rows whose date_of_entry is not a YYYY-MM-DD date.",
+              file=sys.stderr)
+    return 0
+
+
+def module_report(module_code, aggregates):
+    if not aggregates:
+        return None
+    return (module_code, aggregates['count'], round(aggregates['mean'], 2),
+            aggregates['min'], aggregates['max'], *aggregates['grades'].values())
+
+
+async def _module_aggregates(db, module_codes, workers):
+    adb = AsyncMarksDatabase(db, max_workers=workers)
+    try:
+        return await adb.aggregates_for_modules(module_codes)
+    finally:
+        await adb.close()
+
+
+def cmd_report(db, args):
+    # Modules are queried concurrently on a small thread pool
+    aggregates = asyncio.run(_module_aggregates(db, args.modules or db.module_codes(),
+                                                args.workers))
+    output = _open_output(args.output)
+    try:
+        writer = csv.writer(output)
+        writer.writerow(REPORT_COLUMNS)
+        for module_code, module_aggregates in aggregates.items():
+            row = module_report(module_code, module_aggregates)
+            if row:
+                writer.writerow(row)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    return 0
+
+
+def cmd_charts(db, args):
+    # Imported here so the other commands never load matplotlib
+    from marks_reports import generate_reports
+
+    def progress(done, total, module_code):
+        print(f"[{done}/{total}] {module_code}")
+
+    results = generate_reports(db.path, args.output_dir, modules=args.modules,
+                               formats=args.formats, workers=args.workers,
+                               progress=progress)
+    rendered = sum(1 for written in results.values() if written)
+    print(f"Rendered {rendered} modules into {args.output_dir}.")
+    return 0
+
+
+def cmd_bulk_update(db, args):
+    with open(args.path, newline='', encoding='utf-8-sig') as f:
+        reader = csv.DictReader(f)
+        missing = [column for column in UPDATE_COLUMNS if column not in (reader.fieldnames or ())]
+        if missing:
+            print(f"Missing columns: {', '.join(missing)}", file=sys.stderr)
+            return 1
+        rows = []
+        line_numbers = []
+        for line_number, row in enumerate(reader, start=2):
+            values = [(row[column] or '').strip() for column in UPDATE_COLUMNS]
+            # A blank date keeps the stored one
+            values[2] = values[2] or None
+            try:
+                values[3:] = [validate_mark(column, mark)
+                              for column, mark in zip(MARK_COLUMNS, values[3:])]
+            except MarkImportError as e:
+                print(f"Row {line_number}: {e}", file=sys.stderr)
+                return 1
+            rows.append(tuple(values))
+            line_numbers.append(line_number)
+
+    unmatched = set(db.missing_marks({row[:2] for row in rows}))
+    # All rows are applied in one transaction
+    updated = db.update_marks_many(rows)
+    print(f"Updated {updated} rows, {sum(row[:2] in unmatched for row in rows)} matched no marks.")
+    for line_number, row in zip(line_numbers, rows):
+        if row[:2] in unmatched:
+            print(f"  Row {line_number}: no marks for student {row[0]} in {row[1]}", file=sys.stderr)
+    return 1 if unmatched and args.strict else 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='marks_cli',
+                                     description="Mark Registration System (headless)")
+    parser.add_argument('--db', default=DB_PATH, help="database file (default: %(default)s)")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    command = commands.add_parser('import', help="bulk import marks from CSV/XLSX")
+    command.add_argument('path')
+    command.add_argument('--chunk-size', type=int, default=1000)
+    command.add_argument('--strict', action='store_true',
+                         help="exit with status 1 if any row was rejected")
+    command.set_defaults(handler=cmd_import)
+
+    command = commands.add_parser('query', help="print the marks for one module")
+    command.add_argument('module_code')
+    command.set_defaults(handler=cmd_query)
+
+    command = commands.add_parser('export', help="export marks as CSV, XLSX or Parquet")
+    command.add_argument('--module', help="only export this module")
+    command.add_argument('--from', dest='date_from',
+                         help="first date of entry (YYYY-MM-DD); rows whose date is not "
+                              "in that form are skipped")
+    command.add_argument('--to', dest='date_to', help="last date of entry (YYYY-MM-DD)")
+    command.add_argument('--format', choices=FORMATS,
+                         help="output format (default: from the file extension)")
+    command.add_argument('-o', '--output', help="output file (default: CSV on stdout)")
+    command.set_defaults(handler=cmd_export)
+
+    command = commands.add_parser('report', help="aggregate report per module")
+    command.add_argument('modules', nargs='*', help="module codes (default: all)")
+    command.add_argument('-o', '--output', help="output file (default: stdout)")
+    command.add_argument('--workers', type=int, default=4, help="concurrent module queries")
+    command.set_defaults(handler=cmd_report)
+
+    command = commands.add_parser('charts', help="render chart packs for every module in parallel")
+    command.add_argument('modules', nargs='*', help="module codes (default: all)")
+    command.add_argument('-o', '--output-dir', default='reports')
+    command.add_argument('--format', dest='formats', nargs='+', choices=('png', 'pdf'),
+                         default=['png', 'pdf'])
+    command.add_argument('--workers', type=int, help="worker processes (default: one per CPU)")
+    command.set_defaults(handler=cmd_charts)
+
+    command = commands.add_parser('bulk-update', help="apply mark updates, keyed on student_id and module_code, from a CSV file")
+    command.add_argument('path')
+    command.add_argument('--strict', action='store_true',
+                         help="exit with status 1 if any row matched no marks")
+    command.set_defaults(handler=cmd_bulk_update)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    db = MarksDatabase(args.db)
+    try:
+        db.migrate()
+        return args.handler(db, args)
+    except (MarkImportError, MarkExportError, OSError, sqlite3.Error) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+import http.client
+import json
+from urllib.parse import urlsplit
+
+from marks_server import DEFAULT_PORT, READ_METHODS, WRITE_METHODS
+
+# Stands in for MarksDatabase when the app runs against marks_server.py.
+# Method names and arguments are the same; results come back as JSON, so
+# rows are lists rather than tuples
+
+
+class MarksServerError(Exception):
+    pass
+
+
+class MarksClient:
+    def __init__(self, url, token=None, timeout=30):
+        parts = urlsplit(url if '//' in url else f'http://{url}')
+        self.url = url
+        self.host = parts.hostname or '127.0.0.1'
+        self.port = parts.port or DEFAULT_PORT
+        self.token = token
+        self.timeout = timeout
+        self.profiler = None
+
+    def _request(self, method, path, payload=None):
+        body = json.dumps(payload).encode('utf-8') if payload is not None else None
+        headers = {'Content-Type': 'application/json'}
+        if self.token:
+            headers['X-Marks-Token'] = self.token
+
+        # A connection per call: requests come from several worker threads
+        # and the server closes each connection after replying
+        conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        try:
+            conn.request(method, path, body=body, headers=headers)
+            response = conn.getresponse()
+            data = response.read()
+        except OSError as e:
+            raise MarksServerError(f"Cannot reach the marks server at {self.url}: {e}")
+        finally:
+            conn.close()
+
+        try:
+            reply = json.loads(data)
+        except ValueError:
+            raise MarksServerError(f"Unexpected reply from the marks server ({response.status})")
+        if response.status != 200:
+            raise MarksServerError(reply.get('error') or f"Server error {response.status}")
+        return reply.get('result')
+
+    def call(self, method, *args):
+        if self.profiler is None:
+            return self._request('POST', f'/api/{method}', {'args': list(args)})
+        with self.profiler.phase('query'):
+            return self._request('POST', f'/api/{method}', {'args': list(args)})
+
+    def __getattr__(self, name):
+        if name in READ_METHODS or name in WRITE_METHODS:
+            return lambda *args: self.call(name, *args)
+        raise AttributeError(name)
+
+    def status(self):
+        return self._request('GET', '/api/status')
+
+    def migrate(self):
+        # The server migrates its own database; this checks it is reachable
+        self.status()
+
+    def set_profiler(self, profiler):
+        self.profiler = profiler
+
+    def close(self):
+        pass
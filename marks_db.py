@@ -0,0 +1,1116 @@
+import logging
+import sqlite3
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+DB_PATH = 'marks.db'
+
+# Connection tuning applied once per connection instead of once per click
+PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -16000",
+    "PRAGMA foreign_keys = ON",
+)
+
+# SQL is kept in module constants so the sqlite3 statement cache reuses the
+# prepared statements across calls
+#
+# Schema (see _migrate_normalized_schema): each student and module is stored
+# once, and marks rows only carry integer references to them plus the marks
+#   students (id, student_id, student_name, gender)
+#   modules  (id, module_code, module_name)
+#   marks    (id, student_ref, module_ref, coursework_1..3_mark, date_of_entry)
+INSERT_PROGRAM_INFO = '''
+INSERT INTO program_info (num_students, num_modules)
+VALUES (?, ?)
+'''
+
+log = logging.getLogger("marks.db")
+
+# Lookups from the codes users type to the integer keys marks is stored by
+STUDENT_REF = '(SELECT id FROM students WHERE student_id = ?)'
+MODULE_REF = '(SELECT id FROM modules WHERE module_code = ?)'
+
+# Later details win: re-entering a student or module updates their name
+UPSERT_STUDENT = '''
+INSERT INTO students (student_id, student_name, gender)
+VALUES (?, ?, ?)
+ON CONFLICT (student_id) DO UPDATE
+SET student_name = IFNULL(excluded.student_name, student_name),
+    gender = IFNULL(excluded.gender, gender)
+'''
+
+# Modules whose cached rows show this student's name, if re-entering them
+# with the given name would change it
+SELECT_RENAMED_STUDENT_MODULES = '''
+SELECT m.module_code
+FROM students s
+JOIN marks mk ON mk.student_ref = s.id
+JOIN modules m ON m.id = mk.module_ref
+WHERE s.student_id = ? AND ? IS NOT NULL AND s.student_name IS NOT ?
+'''
+
+UPSERT_MODULE = '''
+INSERT INTO modules (module_code, module_name)
+VALUES (?, ?)
+ON CONFLICT (module_code) DO UPDATE
+SET module_name = IFNULL(excluded.module_name, module_name)
+'''
+
+# A student has one marks row per module; entering the same pair again
+# replaces its marks
+INSERT_MARK = f'''
+INSERT INTO marks (
+    student_ref, module_ref, coursework_1_mark, coursework_2_mark,
+    coursework_3_mark, date_of_entry
+) VALUES ({STUDENT_REF}, {MODULE_REF}, ?, ?, ?, ?)
+ON CONFLICT (student_ref, module_ref) DO UPDATE
+SET coursework_1_mark = excluded.coursework_1_mark,
+    coursework_2_mark = excluded.coursework_2_mark,
+    coursework_3_mark = excluded.coursework_3_mark,
+    date_of_entry = excluded.date_of_entry
+'''
+
+SELECT_MARKS_BY_MODULE = f'''
+SELECT s.student_id, s.student_name, mk.coursework_1_mark, mk.coursework_2_mark,
+       mk.coursework_3_mark
+FROM marks mk
+JOIN students s ON s.id = mk.student_ref
+WHERE mk.module_ref = {MODULE_REF}
+ORDER BY mk.id
+'''
+
+# Keyset pagination: the module_ref index already carries the rowid, so
+# "id > ? ORDER BY id" walks the index without a sort or an OFFSET scan
+SELECT_MARKS_PAGE_BY_MODULE = f'''
+SELECT mk.id, s.student_id, s.student_name, mk.coursework_1_mark,
+       mk.coursework_2_mark, mk.coursework_3_mark
+FROM marks mk
+JOIN students s ON s.id = mk.student_ref
+WHERE mk.module_ref = {MODULE_REF} AND mk.id > ?
+ORDER BY mk.id
+LIMIT ?
+'''
+
+COUNT_MARKS_BY_MODULE = f'''
+SELECT COUNT(*) FROM marks WHERE module_ref = {MODULE_REF}
+'''
+
+SELECT_MARKS_BY_STUDENT = f'''
+SELECT m.module_code, m.module_name, mk.coursework_1_mark, mk.coursework_2_mark,
+       mk.coursework_3_mark, mk.date_of_entry
+FROM marks mk
+JOIN modules m ON m.id = mk.module_ref
+WHERE mk.student_ref = {STUDENT_REF}
+ORDER BY m.module_code
+'''
+
+# Updates and deletes are keyed on (student, module) and land on exactly one
+# row through the unique idx_marks_student_module index
+UPDATE_MARK = f'''
+UPDATE marks
+SET date_of_entry = IFNULL(?, date_of_entry),
+    coursework_1_mark = ?, coursework_2_mark = ?, coursework_3_mark = ?
+WHERE student_ref = {STUDENT_REF} AND module_ref = {MODULE_REF}
+'''
+
+DELETE_MARK = f'''
+DELETE FROM marks WHERE student_ref = {STUDENT_REF} AND module_ref = {MODULE_REF}
+'''
+
+MARK_EXISTS = f'''
+SELECT EXISTS (SELECT 1 FROM marks WHERE student_ref = {STUDENT_REF} AND module_ref = {MODULE_REF})
+'''
+
+# Modules with at least one mark; module_summary only holds those
+SELECT_MODULE_CODES = '''
+SELECT m.module_code
+FROM module_summary ms
+JOIN modules m ON m.id = ms.module_ref
+ORDER BY m.module_code
+'''
+
+# Full-text search over who and what each marks row is about. marks_search
+# indexes one document per marks row (rowid = marks.id), kept in step with
+# marks, students and modules by the triggers in
+# _migrate_external_search_content
+SEARCH_MARKS = '''
+SELECT mk.id, s.student_id, s.student_name, m.module_code, m.module_name,
+       mk.coursework_1_mark, mk.coursework_2_mark, mk.coursework_3_mark
+FROM marks_search
+JOIN marks mk ON mk.id = marks_search.rowid
+JOIN students s ON s.id = mk.student_ref
+JOIN modules m ON m.id = mk.module_ref
+WHERE marks_search MATCH ?
+ORDER BY rank
+LIMIT ?
+'''
+
+
+def search_query(text):
+    # Every word the user typed must match the start of some word in the
+    # document: "ali cs1" finds Alice Brown in CS101. Words are quoted so
+    # FTS5 syntax characters are taken literally
+    words = text.replace('"', ' ').split()
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+# Grade bands on the total mark, highest first; anything below the last
+# threshold falls into the final band
+GRADE_BANDS = (('A', 70), ('B', 60), ('C', 50), ('D', 40), ('F', 0))
+
+COURSEWORK_COLUMNS = ('coursework_1_mark', 'coursework_2_mark', 'coursework_3_mark')
+
+
+def _total_mark(prefix=''):
+    return ' + '.join(f'IFNULL({prefix}{column}, 0)' for column in COURSEWORK_COLUMNS)
+
+
+TOTAL_MARK = _total_mark()
+
+
+def _grade_case(total):
+    whens = ' '.join(f"WHEN {total} >= {threshold} THEN '{grade}'"
+                     for grade, threshold in GRADE_BANDS[:-1])
+    return f"CASE {whens} ELSE '{GRADE_BANDS[-1][0]}' END"
+
+
+SELECT_MODULE_TOTALS = f'''
+SELECT s.student_name, {TOTAL_MARK} AS total
+FROM marks mk
+JOIN students s ON s.id = mk.student_ref
+WHERE mk.module_ref = {MODULE_REF}
+ORDER BY mk.id
+'''
+
+EXPORT_COLUMNS = (
+    'module_code', 'module_name', 'student_id', 'student_name', 'gender',
+    'date_of_entry', 'coursework_1_mark', 'coursework_2_mark',
+    'coursework_3_mark', 'total'
+)
+
+SELECT_EXPORT = f'''
+SELECT m.module_code, m.module_name, s.student_id, s.student_name, s.gender,
+       mk.date_of_entry, mk.coursework_1_mark, mk.coursework_2_mark,
+       mk.coursework_3_mark, {TOTAL_MARK} AS total
+FROM marks mk
+JOIN students s ON s.id = mk.student_ref
+JOIN modules m ON m.id = mk.module_ref
+'''
+
+# module_summary keeps per-module aggregates current on every write (see
+# _create_summary_triggers), so summary lookups read one row instead of
+# scanning the module's marks
+SUMMARY_FIELDS = tuple((f'cw{n}', column) for n, column in enumerate(COURSEWORK_COLUMNS, start=1))
+SUMMARY_FIELDS += (('total', None),)
+
+SUMMARY_STAT_COLUMNS = 'row_count, ' + ', '.join(
+    f'{field}_sum, {field}_min, {field}_max' for field, _ in SUMMARY_FIELDS) + ', ' + ', '.join(
+    f'grade_{grade.lower()}' for grade, _ in GRADE_BANDS)
+
+SELECT_MODULE_SUMMARY = f'''
+SELECT m.module_code, m.module_name, {SUMMARY_STAT_COLUMNS}
+FROM module_summary ms
+JOIN modules m ON m.id = ms.module_ref
+WHERE m.module_code = ?
+'''
+
+SELECT_MODULE_SUMMARIES = f'''
+SELECT m.module_code, m.module_name, {SUMMARY_STAT_COLUMNS}
+FROM module_summary ms
+JOIN modules m ON m.id = ms.module_ref
+ORDER BY m.module_code
+'''
+
+
+def insert_marks(cursor, rows):
+    # rows are (module_code, module_name, cw1, cw2, cw3, student_id,
+    # student_name, gender, date_of_entry), the order forms and import files
+    # use. Students and modules are upserted first so the marks rows can
+    # reference them. Returns the module codes whose cached results are now
+    # stale: those in rows plus every module of a student whose name changed
+    rows = list(rows)
+    modules = {row[0] for row in rows}
+    for row in rows:
+        modules.update(code for code, in cursor.execute(
+            SELECT_RENAMED_STUDENT_MODULES, (row[5], row[6], row[6])))
+    cursor.executemany(UPSERT_STUDENT, [(row[5], row[6], row[7]) for row in rows])
+    cursor.executemany(UPSERT_MODULE, [(row[0], row[1]) for row in rows])
+    cursor.executemany(INSERT_MARK, [(row[5], row[0], row[2], row[3], row[4], row[8])
+                                     for row in rows])
+    return modules
+
+
+def _columns(cursor, table):
+    return [info[1] for info in cursor.execute(f"PRAGMA table_info({table})")]
+
+
+def _add_column(cursor, table, column, column_type):
+    if column not in _columns(cursor, table):
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+
+
+def _migrate_base_schema(cursor):
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS program_info (
+        id INTEGER PRIMARY KEY,
+        num_students INTEGER,
+        num_modules INTEGER,
+        admission_year INTEGER
+    )
+    ''')
+
+    # Databases created by av.py keyed marks on student_id, which allows only
+    # one mark per student; rebuild those into the app's id-keyed table
+    existing = _columns(cursor, 'marks')
+    if existing and 'id' not in existing:
+        cursor.execute("ALTER TABLE marks RENAME TO marks_legacy")
+
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS marks (
+        id INTEGER PRIMARY KEY,
+        module_code TEXT,
+        module_name TEXT,
+        coursework_1_mark INTEGER,
+        coursework_2_mark INTEGER,
+        coursework_3_mark INTEGER,
+        student_id TEXT,
+        student_name TEXT,
+        gender TEXT,
+        date_of_entry TEXT,
+        obervation varchar(255)
+    )
+    ''')
+
+    if existing and 'id' not in existing:
+        shared = [column for column in _columns(cursor, 'marks') if column in existing]
+        column_list = ', '.join(shared)
+        cursor.execute(f"INSERT INTO marks ({column_list}) SELECT {column_list} FROM marks_legacy")
+        cursor.execute("DROP TABLE marks_legacy")
+
+    # Columns the app used to bolt on at every start-up
+    _add_column(cursor, 'marks', 'obervation', 'varchar(255)')
+    _add_column(cursor, 'program_info', 'admission_year', 'INTEGER')
+
+
+def _migrate_indexes(cursor):
+    # module_code lookups are case-insensitive, so the index is built with
+    # the same NOCASE collation the queries compare with
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_marks_module_code
+    ON marks (module_code COLLATE NOCASE)
+    ''')
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_marks_student_id
+    ON marks (student_id)
+    ''')
+
+
+def _summary_value(field, column, row):
+    # Expression for one summary field of a marks row; row is NEW or OLD
+    return f'{row}.{column}' if column else f'({_total_mark(row + ".")})'
+
+
+def _summary_add(row, key):
+    # Folds a marks row into its module's summary; min/max only ever widen
+    sets = ['module_name = IFNULL(NEW.module_name, module_name)'] if key == 'module_code' else []
+    sets.append('row_count = row_count + 1')
+    for field, column in SUMMARY_FIELDS:
+        value = _summary_value(field, column, row)
+        sets.append(f'{field}_sum = {field}_sum + IFNULL({value}, 0)')
+        sets.append(f'{field}_min = MIN(IFNULL({field}_min, {value}), IFNULL({value}, {field}_min))')
+        sets.append(f'{field}_max = MAX(IFNULL({field}_max, {value}), IFNULL({value}, {field}_max))')
+    grade = _grade_case(f'({_total_mark(row + ".")})')
+    sets += [f"grade_{band.lower()} = grade_{band.lower()} + ({grade} = '{band}')"
+             for band, _ in GRADE_BANDS]
+    # NOT EXISTS rather than INSERT OR IGNORE: an upsert on marks would
+    # override the trigger's conflict clause
+    return (f"INSERT INTO module_summary ({key}) SELECT {row}.{key} WHERE NOT EXISTS "
+            f"(SELECT 1 FROM module_summary WHERE {key} = {row}.{key});\n"
+            f"UPDATE module_summary SET {', '.join(sets)} "
+            f"WHERE {key} = {row}.{key};\n")
+
+
+def _summary_remove(row, key):
+    # Takes a marks row back out. Removing the current min/max is the one
+    # case that needs the module's marks, and that goes through the index
+    scope = f'{key} = {row}.{key}'
+    if key == 'module_code':
+        scope += ' COLLATE NOCASE'
+    sets = ['row_count = row_count - 1']
+    for field, column in SUMMARY_FIELDS:
+        value = _summary_value(field, column, row)
+        expression = column or f'({TOTAL_MARK})'
+        for bound in ('min', 'max'):
+            sets.append(
+                f'{field}_{bound} = CASE WHEN {value} = {field}_{bound} THEN '
+                f'(SELECT {bound.upper()}({expression}) FROM marks WHERE {scope}) '
+                f'ELSE {field}_{bound} END')
+        sets.append(f'{field}_sum = {field}_sum - IFNULL({value}, 0)')
+    grade = _grade_case(f'({_total_mark(row + ".")})')
+    sets += [f"grade_{band.lower()} = grade_{band.lower()} - ({grade} = '{band}')"
+             for band, _ in GRADE_BANDS]
+    return (f"UPDATE module_summary SET {', '.join(sets)} "
+            f"WHERE {key} = {row}.{key};\n"
+            f"DELETE FROM module_summary WHERE {key} = {row}.{key} AND row_count <= 0;\n")
+
+
+SUMMARY_TRIGGERS = ('marks_summary_insert', 'marks_summary_delete', 'marks_summary_update')
+
+
+def _summary_table_columns():
+    columns = ',\n'.join(
+        f'    {field}_sum INTEGER NOT NULL DEFAULT 0, {field}_min INTEGER, {field}_max INTEGER'
+        for field, _ in SUMMARY_FIELDS)
+    grades = ',\n'.join(f'    grade_{grade.lower()} INTEGER NOT NULL DEFAULT 0'
+                        for grade, _ in GRADE_BANDS)
+    return f'    row_count INTEGER NOT NULL DEFAULT 0,\n{columns},\n{grades}'
+
+
+def _summary_aggregates():
+    # Summary columns computed from scratch over a group of marks rows
+    aggregates = ', '.join(
+        f'IFNULL(SUM({expression}), 0), MIN({expression}), MAX({expression})'
+        for expression in COURSEWORK_COLUMNS + (f'({TOTAL_MARK})',))
+    grades = ', '.join(f"SUM({_grade_case(f'({TOTAL_MARK})')} = '{grade}')"
+                       for grade, _ in GRADE_BANDS)
+    return f'COUNT(*), {aggregates}, {grades}'
+
+
+def _create_summary_triggers(cursor, key, updated_columns):
+    insert, delete, update = SUMMARY_TRIGGERS
+    for name, event, body in (
+            (insert, 'INSERT', _summary_add('NEW', key)),
+            (delete, 'DELETE', _summary_remove('OLD', key)),
+            (update, f"UPDATE OF {', '.join(updated_columns)}",
+             _summary_remove('OLD', key) + _summary_add('NEW', key))):
+        cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+        cursor.execute(f"CREATE TRIGGER {name} AFTER {event} ON marks BEGIN\n{body}END")
+
+
+def _migrate_module_summary(cursor):
+    # NOCASE key: 'cs101' and 'CS101' share one summary, as they share a
+    # search result
+    cursor.execute(f'''
+    CREATE TABLE IF NOT EXISTS module_summary (
+        module_code TEXT PRIMARY KEY COLLATE NOCASE,
+        module_name TEXT,
+    {_summary_table_columns()}
+    )
+    ''')
+    _create_summary_triggers(cursor, 'module_code',
+                             ('module_code', 'module_name') + COURSEWORK_COLUMNS)
+
+    # Backfill from the marks already in the database
+    cursor.execute("DELETE FROM module_summary")
+    cursor.execute(f'''
+    INSERT INTO module_summary (module_code, module_name, {SUMMARY_STAT_COLUMNS})
+    SELECT module_code, MAX(module_name), {_summary_aggregates()}
+    FROM marks
+    GROUP BY module_code COLLATE NOCASE
+    ''')
+
+
+def _migrate_normalized_schema(cursor):
+    # The flat marks table repeated the student's and module's details on
+    # every row. Split them out, keyed by integer ids, and point the marks
+    # rows and the summary at those ids
+    for trigger in SUMMARY_TRIGGERS:
+        cursor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    cursor.execute("DROP TABLE IF EXISTS module_summary")
+
+    cursor.execute('''
+    CREATE TABLE students (
+        id INTEGER PRIMARY KEY,
+        student_id TEXT NOT NULL UNIQUE,
+        student_name TEXT,
+        gender TEXT
+    )
+    ''')
+    cursor.execute('''
+    CREATE TABLE modules (
+        id INTEGER PRIMARY KEY,
+        module_code TEXT NOT NULL UNIQUE COLLATE NOCASE,
+        module_name TEXT
+    )
+    ''')
+
+    # A bare column next to MAX(id) comes from the row holding the maximum,
+    # so each student/module keeps the details from its latest entry
+    cursor.execute('''
+    INSERT INTO students (student_id, student_name, gender)
+    SELECT student_id, student_name, gender FROM (
+        SELECT IFNULL(student_id, '') AS student_id, student_name, gender, MAX(id)
+        FROM marks GROUP BY IFNULL(student_id, '')
+    )
+    ''')
+    cursor.execute('''
+    INSERT INTO modules (module_code, module_name)
+    SELECT module_code, module_name FROM (
+        SELECT IFNULL(module_code, '') AS module_code, module_name, MAX(id)
+        FROM marks GROUP BY IFNULL(module_code, '') COLLATE NOCASE
+    )
+    ''')
+
+    cursor.execute("ALTER TABLE marks RENAME TO marks_flat")
+    cursor.execute('''
+    CREATE TABLE marks (
+        id INTEGER PRIMARY KEY,
+        student_ref INTEGER NOT NULL REFERENCES students (id),
+        module_ref INTEGER NOT NULL REFERENCES modules (id),
+        coursework_1_mark INTEGER,
+        coursework_2_mark INTEGER,
+        coursework_3_mark INTEGER,
+        date_of_entry TEXT,
+        obervation varchar(255)
+    )
+    ''')
+    cursor.execute('''
+    INSERT INTO marks (id, student_ref, module_ref, coursework_1_mark,
+                       coursework_2_mark, coursework_3_mark, date_of_entry, obervation)
+    SELECT f.id, s.id, m.id, f.coursework_1_mark, f.coursework_2_mark,
+           f.coursework_3_mark, f.date_of_entry, f.obervation
+    FROM marks_flat f
+    JOIN students s ON s.student_id = IFNULL(f.student_id, '')
+    JOIN modules m ON m.module_code = IFNULL(f.module_code, '')
+    ''')
+    # Also drops the old text indexes
+    cursor.execute("DROP TABLE marks_flat")
+
+    cursor.execute("CREATE INDEX idx_marks_module_ref ON marks (module_ref)")
+    cursor.execute("CREATE INDEX idx_marks_student_ref ON marks (student_ref)")
+
+    cursor.execute(f'''
+    CREATE TABLE module_summary (
+        module_ref INTEGER PRIMARY KEY REFERENCES modules (id),
+    {_summary_table_columns()}
+    )
+    ''')
+    _create_summary_triggers(cursor, 'module_ref', ('module_ref',) + COURSEWORK_COLUMNS)
+    _backfill_module_summary(cursor)
+
+
+def _backfill_module_summary(cursor):
+    cursor.execute("DELETE FROM module_summary")
+    cursor.execute(f'''
+    INSERT INTO module_summary (module_ref, {SUMMARY_STAT_COLUMNS})
+    SELECT module_ref, {_summary_aggregates()}
+    FROM marks
+    GROUP BY module_ref
+    ''')
+
+
+def _migrate_student_module_key(cursor):
+    # Older versions allowed the same student/module pair to be entered more
+    # than once, and the app was not consistent about which entry counted:
+    # Search showed the earliest, View Marks listed them all. The newest
+    # entry stays in marks; the others are moved to marks_duplicates (with
+    # the id of the row that was kept) rather than deleted, for review.
+    # The summary triggers would rescan a module for every removed row that
+    # held one of its minimums or maximums, so they are dropped for the
+    # delete and the summary is rebuilt once afterwards
+    for trigger in SUMMARY_TRIGGERS:
+        cursor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    cursor.execute('''
+    CREATE TABLE marks_duplicates AS
+    SELECT mk.*, latest.id AS kept_id
+    FROM marks mk
+    JOIN (SELECT student_ref, module_ref, MAX(id) AS id
+          FROM marks
+          GROUP BY student_ref, module_ref) latest
+      ON latest.student_ref IS mk.student_ref AND latest.module_ref IS mk.module_ref
+    WHERE mk.id <> latest.id
+    ''')
+    cursor.execute("DELETE FROM marks WHERE id IN (SELECT id FROM marks_duplicates)")
+    if cursor.rowcount:
+        log.warning("moved %d duplicate student/module marks rows to marks_duplicates",
+                    cursor.rowcount)
+    cursor.execute('''
+    CREATE UNIQUE INDEX idx_marks_student_module
+    ON marks (student_ref, module_ref)
+    ''')
+    # Lookups by student alone use the leading column of the new index
+    cursor.execute("DROP INDEX IF EXISTS idx_marks_student_ref")
+
+    # Re-entering a pair is now an upsert, which the previous triggers did
+    # not handle
+    _create_summary_triggers(cursor, 'module_ref', ('module_ref',) + COURSEWORK_COLUMNS)
+    _backfill_module_summary(cursor)
+
+
+SEARCH_DOCUMENT = '''
+SELECT mk.id, s.student_name, s.student_id, m.module_code, m.module_name
+FROM marks mk
+JOIN students s ON s.id = mk.student_ref
+JOIN modules m ON m.id = mk.module_ref
+'''
+
+
+def _migrate_search_index(cursor):
+    # prefix='2 3' keeps short search-as-you-type prefixes on an index
+    # instead of a scan over every term
+    cursor.execute('''
+    CREATE VIRTUAL TABLE marks_search USING fts5(
+        student_name, student_id, module_code, module_name,
+        tokenize = 'unicode61', prefix = '2 3'
+    )
+    ''')
+    insert = ("INSERT INTO marks_search (rowid, student_name, student_id, module_code, module_name)\n"
+              + SEARCH_DOCUMENT)
+    cursor.execute(insert)
+
+    triggers = {
+        'marks_search_insert': f'''
+        AFTER INSERT ON marks BEGIN
+            {insert} WHERE mk.id = NEW.id;
+        END''',
+        'marks_search_delete': '''
+        AFTER DELETE ON marks BEGIN
+            DELETE FROM marks_search WHERE rowid = OLD.id;
+        END''',
+        'marks_search_update': f'''
+        AFTER UPDATE OF student_ref, module_ref ON marks BEGIN
+            DELETE FROM marks_search WHERE rowid = OLD.id;
+            {insert} WHERE mk.id = NEW.id;
+        END''',
+        # Renaming a student or module re-indexes their rows; the upserts in
+        # insert_marks rewrite names on every entry, so unchanged names skip it
+        'students_search_update': f'''
+        AFTER UPDATE OF student_name, student_id ON students
+        WHEN OLD.student_name IS NOT NEW.student_name OR OLD.student_id IS NOT NEW.student_id
+        BEGIN
+            DELETE FROM marks_search WHERE rowid IN (SELECT id FROM marks WHERE student_ref = NEW.id);
+            {insert} WHERE mk.student_ref = NEW.id;
+        END''',
+        'modules_search_update': f'''
+        AFTER UPDATE OF module_name, module_code ON modules
+        WHEN OLD.module_name IS NOT NEW.module_name OR OLD.module_code IS NOT NEW.module_code
+        BEGIN
+            DELETE FROM marks_search WHERE rowid IN (SELECT id FROM marks WHERE module_ref = NEW.id);
+            {insert} WHERE mk.module_ref = NEW.id;
+        END''',
+    }
+    for name, body in triggers.items():
+        cursor.execute(f"CREATE TRIGGER {name} {body}")
+
+
+def _migrate_external_search_content(cursor):
+    # marks_search kept its own copy of every row's names and codes, which
+    # undid much of what normalizing saved. The index now reads them from a
+    # view over the normalized tables (an external content table), so it
+    # only stores the index itself
+    for trigger in ('marks_search_insert', 'marks_search_delete', 'marks_search_update',
+                    'students_search_update', 'modules_search_update'):
+        cursor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    cursor.execute("DROP TABLE IF EXISTS marks_search")
+
+    cursor.execute("CREATE VIEW marks_search_source AS" + SEARCH_DOCUMENT)
+    cursor.execute('''
+    CREATE VIRTUAL TABLE marks_search USING fts5(
+        student_name, student_id, module_code, module_name,
+        content = 'marks_search_source', content_rowid = 'id',
+        tokenize = 'unicode61', prefix = '2 3'
+    )
+    ''')
+    cursor.execute("INSERT INTO marks_search (marks_search) VALUES ('rebuild')")
+
+    # An external content index is updated by hand: entries are removed with
+    # a 'delete' command carrying exactly the values that were indexed, so
+    # the triggers pass the old names and codes
+    columns = 'student_name, student_id, module_code, module_name'
+    index = f"INSERT INTO marks_search (rowid, {columns})\nSELECT id, {columns} FROM marks_search_source"
+    unindex = f"INSERT INTO marks_search (marks_search, rowid, {columns})\nSELECT 'delete', "
+    unindex_mark = (unindex + "OLD.id, s.student_name, s.student_id, m.module_code, m.module_name "
+                    "FROM students s, modules m WHERE s.id = OLD.student_ref AND m.id = OLD.module_ref")
+    triggers = {
+        'marks_search_insert': f'''
+        AFTER INSERT ON marks BEGIN
+            {index} WHERE id = NEW.id;
+        END''',
+        'marks_search_delete': f'''
+        AFTER DELETE ON marks BEGIN
+            {unindex_mark};
+        END''',
+        'marks_search_update': f'''
+        AFTER UPDATE OF student_ref, module_ref ON marks BEGIN
+            {unindex_mark};
+            {index} WHERE id = NEW.id;
+        END''',
+        # Renaming a student or module re-indexes their rows; the upserts in
+        # insert_marks rewrite names on every entry, so unchanged names skip it
+        'students_search_update': f'''
+        AFTER UPDATE OF student_name, student_id ON students
+        WHEN OLD.student_name IS NOT NEW.student_name OR OLD.student_id IS NOT NEW.student_id
+        BEGIN
+            {unindex}mk.id, OLD.student_name, OLD.student_id, m.module_code, m.module_name
+            FROM marks mk JOIN modules m ON m.id = mk.module_ref WHERE mk.student_ref = OLD.id;
+            {index} WHERE id IN (SELECT id FROM marks WHERE student_ref = NEW.id);
+        END''',
+        'modules_search_update': f'''
+        AFTER UPDATE OF module_name, module_code ON modules
+        WHEN OLD.module_name IS NOT NEW.module_name OR OLD.module_code IS NOT NEW.module_code
+        BEGIN
+            {unindex}mk.id, s.student_name, s.student_id, OLD.module_code, OLD.module_name
+            FROM marks mk JOIN students s ON s.id = mk.student_ref WHERE mk.module_ref = OLD.id;
+            {index} WHERE id IN (SELECT id FROM marks WHERE module_ref = NEW.id);
+        END''',
+    }
+    for name, body in triggers.items():
+        cursor.execute(f"CREATE TRIGGER {name} {body}")
+
+
+# Applied in order; PRAGMA user_version records how many have run. Append new
+# migrations to the end, never edit or reorder existing ones
+MIGRATIONS = (
+    _migrate_base_schema,
+    _migrate_indexes,
+    _migrate_module_summary,
+    _migrate_normalized_schema,
+    _migrate_student_module_key,
+    _migrate_search_index,
+    _migrate_external_search_content,
+)
+SCHEMA_VERSION = len(MIGRATIONS)
+# Migrations that rebuild or drop tables, or delete rows, leaving the old
+# pages on the freelist
+REBUILDING_MIGRATIONS = (
+    _migrate_base_schema,
+    _migrate_normalized_schema,
+    _migrate_student_module_key,
+    _migrate_external_search_content,
+)
+
+
+class ModuleCache:
+    # Size-bounded LRU of per-module query results. Entries are keyed by the
+    # case-folded module code plus the query and its arguments, so a write to
+    # a module drops every cached page/aggregate for it in one go
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._generations = {}
+        # Bumped by clear(), which stales every module at once
+        self._epoch = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _module(module_code):
+        return (module_code or '').lower()
+
+    def get_or_load(self, module_code, key, loader):
+        module = self._module(module_code)
+        key = (module,) + key
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+            generation = (self._epoch, self._generations.get(module, 0))
+
+        value = loader()
+
+        with self._lock:
+            # Don't store a result that a concurrent write has made stale
+            if (self._epoch, self._generations.get(module, 0)) == generation:
+                self._entries[key] = value
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+        return value
+
+    def invalidate(self, module_codes=None):
+        # None drops everything, e.g. after a bulk import
+        with self._lock:
+            if module_codes is None:
+                # Also covers loads still running for modules never cached
+                self._epoch += 1
+                self._entries.clear()
+                self._generations.clear()
+                return
+            modules = {self._module(code) for code in module_codes}
+            for module in modules:
+                self._generations[module] = self._generations.get(module, 0) + 1
+            for key in [key for key in self._entries if key[0] in modules]:
+                del self._entries[key]
+
+    def clear(self):
+        self.invalidate()
+
+
+class MarksDatabase:
+    def __init__(self, path=DB_PATH, cache_size=128):
+        self.path = path
+        self.cache = ModuleCache(cache_size)
+        self.profiler = None
+        # One long-lived connection per thread: the Tk thread gets its own and
+        # every background worker lazily opens one the first time it is used
+        self._local = threading.local()
+        self._connections = []
+        self._pool_lock = threading.Lock()
+        self._write_lock = threading.RLock()
+        # Connection only used to read PRAGMA data_version (see
+        # _check_data_version), with the last value it gave
+        self._watch = None
+        self._watch_lock = threading.Lock()
+        self._data_version = None
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False,
+                               cached_statements=256)
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        if self.profiler:
+            conn.set_trace_callback(self.profiler.trace)
+        return conn
+
+    def set_profiler(self, profiler):
+        # Statement text from every pooled connection goes to the profiler
+        self.profiler = profiler
+        with self._pool_lock:
+            for conn in self._connections:
+                conn.set_trace_callback(profiler.trace if profiler else None)
+
+    @property
+    def conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+            with self._pool_lock:
+                self._connections.append(conn)
+        return conn
+
+    def interruptible(self, fn):
+        # Returns (run, interrupt): run(*args) calls fn on the caller's
+        # thread, and interrupt() from any other thread aborts the SQL it is
+        # running with sqlite3.OperationalError. Only the connections of
+        # calls still inside run are interrupted, so a thread that has moved
+        # on to other work is left alone
+        running = []
+        lock = threading.Lock()
+
+        def run(*args):
+            conn = self.conn
+            with lock:
+                running.append(conn)
+            try:
+                return fn(*args)
+            finally:
+                with lock:
+                    running.remove(conn)
+
+        def interrupt():
+            with lock:
+                for conn in running:
+                    conn.interrupt()
+
+        return run, interrupt
+
+    @contextmanager
+    def transaction(self):
+        # Writers are serialised inside the process so background workers do
+        # not trip over each other's locks; commits/rollbacks on exit.
+        # Nested calls become savepoints, so several writes can share one
+        # commit (see group_commit.GroupCommitWriter) while each still rolls
+        # back on its own
+        with self._write_lock:
+            conn = self.conn
+            depth = getattr(self._local, 'depth', 0)
+            savepoint = f'write_{depth}'
+            if depth:
+                conn.execute(f"SAVEPOINT {savepoint}")
+            else:
+                if not conn.in_transaction:
+                    # IMMEDIATE takes the write lock up front instead of
+                    # failing to upgrade a read lock half way through
+                    conn.execute("BEGIN IMMEDIATE")
+                self._local.stale = set()
+            self._local.depth = depth + 1
+            try:
+                yield conn.cursor()
+            except BaseException:
+                if depth:
+                    conn.execute(f"ROLLBACK TO {savepoint}")
+                    conn.execute(f"RELEASE {savepoint}")
+                else:
+                    conn.rollback()
+                raise
+            else:
+                if depth:
+                    conn.execute(f"RELEASE {savepoint}")
+                else:
+                    conn.commit()
+            finally:
+                self._local.depth = depth
+                if not depth:
+                    stale, self._local.stale = self._local.stale, None
+                    if stale:
+                        self.cache.invalidate(stale)
+
+    def invalidate(self, module_codes):
+        # Writes call this once their rows are in. Inside an enclosing
+        # transaction (a group commit) other connections only see the rows
+        # after the outermost commit, so the modules are dropped from the
+        # cache then; dropping them earlier lets a reader cache the old rows
+        stale = getattr(self._local, 'stale', None)
+        if stale is not None:
+            stale.update(module_codes)
+        else:
+            self.cache.invalidate(module_codes)
+
+    def _check_data_version(self):
+        # The cache only hears about writes made through this object. Other
+        # processes (a second app, marks_cli.py) are caught by PRAGMA
+        # data_version, which changes whenever another connection commits.
+        # That includes this object's connections on other threads, so
+        # their commits clear the cache too
+        with self._watch_lock:
+            if self._watch is None:
+                self._watch = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            version = self._watch.execute("PRAGMA data_version").fetchone()[0]
+            changed = version != self._data_version
+            self._data_version = version
+        if changed:
+            self.cache.clear()
+
+    def close(self):
+        with self._pool_lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            # Lets SQLite refresh planner statistics for the indexes it used
+            conn.execute("PRAGMA optimize")
+            conn.close()
+        self._local = threading.local()
+        with self._watch_lock:
+            if self._watch is not None:
+                self._watch.close()
+                self._watch = None
+                self._data_version = None
+
+    # Schema
+
+    def schema_version(self):
+        return self.conn.execute("PRAGMA user_version").fetchone()[0]
+
+    def migrate(self):
+        # The common case - an up-to-date database - costs one PRAGMA read
+        if self.schema_version() >= SCHEMA_VERSION:
+            return
+
+        # DDL does not open a transaction implicitly in sqlite3, so begin one
+        # explicitly; IMMEDIATE also stops two instances migrating at once
+        with self._write_lock:
+            conn = self.conn
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                version = self.schema_version()
+                cursor = conn.cursor()
+                held_marks = bool(_columns(cursor, 'marks')) and \
+                    cursor.execute("SELECT EXISTS (SELECT 1 FROM marks)").fetchone()[0]
+                pending = MIGRATIONS[version:]
+                for migration in pending:
+                    migration(cursor)
+                cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            except BaseException:
+                conn.rollback()
+                raise
+            conn.commit()
+            if held_marks and any(migration in REBUILDING_MIGRATIONS for migration in pending):
+                # Reclaim the pages the rebuilt tables left behind so the
+                # file actually shrinks
+                conn.execute("VACUUM")
+        self.cache.clear()
+
+    # Queries
+
+    def save_program_info(self, num_students, num_modules):
+        with self.transaction() as cursor:
+            cursor.execute(INSERT_PROGRAM_INFO, (num_students, num_modules))
+
+    def insert_mark(self, module_code, module_name, coursework_1_mark,
+                    coursework_2_mark, coursework_3_mark, student_id,
+                    student_name, gender, date_of_entry):
+        return self.insert_marks_many([(
+            module_code, module_name, coursework_1_mark, coursework_2_mark,
+            coursework_3_mark, student_id, student_name, gender, date_of_entry
+        )])
+
+    def insert_marks_many(self, rows):
+        # rows are in insert_mark's argument order; all of them are written
+        # in one transaction
+        rows = list(rows)
+        with self.transaction() as cursor:
+            modules = insert_marks(cursor, rows)
+        self.invalidate(modules)
+        return len(rows)
+
+    def _fetchall(self, sql, params):
+        if self.profiler is None:
+            return self.conn.execute(sql, params).fetchall()
+        with self.profiler.phase('query'):
+            cursor = self.conn.execute(sql, params)
+        with self.profiler.phase('fetch'):
+            return cursor.fetchall()
+
+    def _cached(self, module_code, sql, params):
+        self._check_data_version()
+        return self.cache.get_or_load(module_code, (sql, params),
+                                      lambda: self._fetchall(sql, params))
+
+    def marks_for_module(self, module_code):
+        return self._cached(module_code, SELECT_MARKS_BY_MODULE, (module_code,))
+
+    def marks_page_for_module(self, module_code, after_id=0, limit=100):
+        return self._cached(module_code, SELECT_MARKS_PAGE_BY_MODULE,
+                            (module_code, after_id, limit))
+
+    def count_marks_for_module(self, module_code):
+        return self._cached(module_code, COUNT_MARKS_BY_MODULE, (module_code,))[0][0]
+
+    def search(self, text, limit=50):
+        # Prefix search over student names/IDs and module codes/names
+        query = search_query(text)
+        if not query:
+            return []
+        return self._fetchall(SEARCH_MARKS, (query, limit))
+
+    def marks_for_student(self, student_id):
+        return self.conn.execute(SELECT_MARKS_BY_STUDENT, (student_id,)).fetchall()
+
+    def update_mark(self, student_id, module_code, date_of_entry,
+                    coursework_1_mark, coursework_2_mark, coursework_3_mark):
+        return self.update_marks_many([(student_id, module_code, date_of_entry,
+                                         coursework_1_mark, coursework_2_mark, coursework_3_mark)])
+
+    def update_marks_many(self, rows):
+        # rows are (student_id, module_code, date_of_entry, cw1, cw2, cw3),
+        # the same order update_mark takes its arguments in; a None date
+        # keeps the stored one. All of them are applied in one transaction
+        rows = list(rows)
+        params = [(date_of_entry, cw1, cw2, cw3, student_id, module_code)
+                  for student_id, module_code, date_of_entry, cw1, cw2, cw3 in rows]
+        with self.transaction() as cursor:
+            cursor.executemany(UPDATE_MARK, params)
+            updated = cursor.rowcount
+        if updated:
+            self.invalidate({row[1] for row in rows})
+        return updated
+
+    def missing_marks(self, keys):
+        # The (student_id, module_code) keys that have no marks row, which
+        # updates and deletes would silently skip
+        return [key for key in keys if not self.conn.execute(MARK_EXISTS, key).fetchone()[0]]
+
+    def delete_marks(self, keys):
+        # keys are (student_id, module_code) pairs, deleted in one transaction
+        keys = list(keys)
+        with self.transaction() as cursor:
+            cursor.executemany(DELETE_MARK, keys)
+            deleted = cursor.rowcount
+        if deleted:
+            self.invalidate({module_code for _, module_code in keys})
+        return deleted
+
+    def module_codes(self):
+        return [row[0] for row in self.conn.execute(SELECT_MODULE_CODES)]
+
+    @staticmethod
+    def _export_filters(module_code=None, date_from=None, date_to=None):
+        # date_of_entry is free text from the forms, so date bounds compare
+        # date(date_of_entry): rows whose date is not YYYY-MM-DD give NULL
+        # there and are left out rather than compared as strings
+        filters = []
+        params = []
+        if module_code:
+            filters.append(f"mk.module_ref = {MODULE_REF}")
+            params.append(module_code)
+        if date_from:
+            filters.append("date(mk.date_of_entry) >= ?")
+            params.append(date_from)
+        if date_to:
+            filters.append("date(mk.date_of_entry) <= ?")
+            params.append(date_to)
+        where = "WHERE " + " AND ".join(filters) + "\n" if filters else ""
+        return where, params
+
+    def iter_mark_batches(self, module_code=None, date_from=None, date_to=None, batch_size=1000):
+        # Streams rows straight off the cursor so exports of the whole
+        # database never hold more than one batch in memory. Dates are
+        # inclusive ISO (YYYY-MM-DD) bounds on date_of_entry
+        where, params = self._export_filters(module_code, date_from, date_to)
+        cursor = self.conn.execute(SELECT_EXPORT + where + "ORDER BY mk.id", params)
+        try:
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield rows
+        finally:
+            cursor.close()
+
+    def count_undated_marks(self, module_code=None):
+        # Rows a date-filtered export skips because their date_of_entry is
+        # not a YYYY-MM-DD date
+        sql = "SELECT COUNT(*) FROM marks mk WHERE date(mk.date_of_entry) IS NULL"
+        params = ()
+        if module_code:
+            sql += f" AND mk.module_ref = {MODULE_REF}"
+            params = (module_code,)
+        return self.conn.execute(sql, params).fetchone()[0]
+
+    def iter_marks(self, module_code=None, batch_size=1000, date_from=None, date_to=None):
+        for rows in self.iter_mark_batches(module_code, date_from, date_to, batch_size):
+            yield from rows
+
+    def module_totals(self, module_code):
+        return self._cached(module_code, SELECT_MODULE_TOTALS, (module_code,))
+
+    @staticmethod
+    def _summary(row):
+        module_code, module_name, count = row[:3]
+        fields = {}
+        for i, (field, _) in enumerate(SUMMARY_FIELDS):
+            total, minimum, maximum = row[3 + 3 * i:6 + 3 * i]
+            fields[field] = (total, total / count, minimum, maximum)
+        total, mean, minimum, maximum = fields['total']
+        return {
+            'module_code': module_code,
+            'module_name': module_name,
+            'count': count,
+            'sum': total,
+            'mean': mean,
+            'min': minimum,
+            'max': maximum,
+            'coursework_means': tuple(fields[field][1] for field, column in SUMMARY_FIELDS if column),
+            'coursework': {field: fields[field] for field, column in SUMMARY_FIELDS if column},
+            'grades': dict(zip((grade for grade, _ in GRADE_BANDS), row[3 + 3 * len(SUMMARY_FIELDS):]))
+        }
+
+    def module_aggregates(self, module_code):
+        # One row of module_summary, kept current by triggers
+        rows = self._cached(module_code, SELECT_MODULE_SUMMARY, (module_code,))
+        if not rows or not rows[0][2]:
+            return None
+        return self._summary(rows[0])
+
+    def module_summaries(self):
+        return [self._summary(row) for row in self._fetchall(SELECT_MODULE_SUMMARIES, ())]
+
+    def chart_data(self, module_code):
+        # Everything charts.ModuleChart needs for one module. Totals and the
+        # grade distribution are computed by SQLite, so only names and totals
+        # cross into Python
+        aggregates = self.module_aggregates(module_code)
+        if not aggregates:
+            return None
+
+        totals = self.module_totals(module_code)
+        return {
+            'student_names': [row[0] for row in totals],
+            'total_marks': [row[1] for row in totals],
+            'grades': aggregates['grades'],
+            'mean': aggregates['mean'],
+            'aggregates': aggregates
+        }
@@ -0,0 +1,118 @@
+import csv
+import datetime
+import os
+from collections import namedtuple
+
+from marks_db import EXPORT_COLUMNS
+
+# Exports stream straight off a database cursor, one batch at a time, so
+# even a full-database export holds at most BATCH_SIZE rows in memory
+FORMATS = ('csv', 'xlsx', 'parquet')
+BATCH_SIZE = 5000
+
+# Column types for Parquet; the marks and total are whole numbers
+INTEGER_COLUMNS = ('coursework_1_mark', 'coursework_2_mark', 'coursework_3_mark', 'total')
+
+# skipped counts rows a date filter left out because their date_of_entry
+# is not a YYYY-MM-DD date
+ExportResult = namedtuple('ExportResult', 'written skipped')
+
+
+class MarkExportError(ValueError):
+    pass
+
+
+def export_format(path, fmt=None):
+    fmt = (fmt or os.path.splitext(path)[1].lstrip('.')).lower()
+    if fmt not in FORMATS:
+        raise MarkExportError(f"Unsupported export format: {fmt or path}")
+    return fmt
+
+
+def parse_date(value):
+    # Dates are compared as ISO text, so anything else would filter wrongly
+    if not value:
+        return None
+    try:
+        return datetime.date.fromisoformat(value.strip()).isoformat()
+    except ValueError:
+        raise MarkExportError(f"Dates must be YYYY-MM-DD: {value!r}")
+
+
+def _write_csv(path, batches, progress):
+    written = 0
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(EXPORT_COLUMNS)
+        for batch in batches:
+            writer.writerows(batch)
+            written += len(batch)
+            if progress:
+                progress(written)
+    return written
+
+
+def _write_xlsx(path, batches, progress):
+    try:
+        import openpyxl
+    except ImportError:
+        raise MarkExportError("Writing Excel files requires the openpyxl package.")
+
+    # Write-only workbooks stream rows to disk instead of keeping every cell
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet('marks')
+    sheet.append(EXPORT_COLUMNS)
+    written = 0
+    for batch in batches:
+        for row in batch:
+            sheet.append(row)
+        written += len(batch)
+        if progress:
+            progress(written)
+    workbook.save(path)
+    return written
+
+
+def _write_parquet(path, batches, progress):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise MarkExportError("Writing Parquet files requires the pyarrow package.")
+
+    schema = pa.schema([(column, pa.int64() if column in INTEGER_COLUMNS else pa.string())
+                        for column in EXPORT_COLUMNS])
+    written = 0
+    # Each batch becomes one row group
+    with pq.ParquetWriter(path, schema) as writer:
+        for batch in batches:
+            columns = list(zip(*batch))
+            writer.write_batch(pa.record_batch(
+                [pa.array(values, type=field.type) for values, field in zip(columns, schema)],
+                schema=schema))
+            written += len(batch)
+            if progress:
+                progress(written)
+    return written
+
+
+WRITERS = {
+    'csv': _write_csv,
+    'xlsx': _write_xlsx,
+    'parquet': _write_parquet,
+}
+
+
+def export_marks(db, path, fmt=None, module_code=None, date_from=None, date_to=None,
+                 batch_size=BATCH_SIZE, progress=None):
+    fmt = export_format(path, fmt)
+    date_from, date_to = parse_date(date_from), parse_date(date_to)
+    skipped = db.count_undated_marks(module_code) if date_from or date_to else 0
+    batches = db.iter_mark_batches(module_code, date_from, date_to, batch_size)
+    try:
+        return ExportResult(WRITERS[fmt](path, batches, progress), skipped)
+    except BaseException:
+        # A failed or cancelled export leaves no partial file behind
+        if os.path.exists(path):
+            os.remove(path)
+        raise
@@ -0,0 +1,179 @@
+import csv
+import datetime
+import os
+from collections import namedtuple
+
+from marks_db import insert_marks
+
+# Column order matches marks_db.insert_marks
+COLUMNS = (
+    'module_code', 'module_name', 'coursework_1_mark', 'coursework_2_mark',
+    'coursework_3_mark', 'student_id', 'student_name', 'gender', 'date_of_entry'
+)
+MARK_COLUMNS = ('coursework_1_mark', 'coursework_2_mark', 'coursework_3_mark')
+GENDERS = {'male': 'Male', 'female': 'Female'}
+
+CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 20
+
+ImportResult = namedtuple('ImportResult', 'imported rejected errors')
+
+
+class MarkImportError(ValueError):
+    pass
+
+
+def normalise_header(name):
+    # "Coursework 1 Mark" and "coursework_1_mark" are both accepted
+    return '_'.join(str(name or '').strip().lower().split())
+
+
+def _cell_text(value):
+    if value is None:
+        return ''
+    if isinstance(value, datetime.datetime):
+        return value.date().isoformat()
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def _rows_from_table(rows):
+    try:
+        header = next(rows)
+    except StopIteration:
+        raise MarkImportError("The file is empty.")
+
+    header = [normalise_header(name) for name in header]
+    missing = [column for column in COLUMNS if column not in header]
+    if missing:
+        raise MarkImportError(f"Missing columns: {', '.join(missing)}")
+
+    positions = [header.index(column) for column in COLUMNS]
+    # Line 1 is the header row
+    for line_number, row in enumerate(rows, start=2):
+        row = list(row)
+        if not any(_cell_text(value) for value in row):
+            continue
+        row += [None] * (len(header) - len(row))
+        yield line_number, [_cell_text(row[position]) for position in positions]
+
+
+def _read_csv(path):
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        yield from _rows_from_table(csv.reader(f))
+
+
+def _read_xlsx(path):
+    try:
+        import openpyxl
+    except ImportError:
+        raise MarkImportError("Reading Excel files requires the openpyxl package.")
+
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        sheet = workbook.active
+        yield from _rows_from_table(sheet.iter_rows(values_only=True))
+    finally:
+        workbook.close()
+
+
+def read_rows(path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.csv':
+        return _read_csv(path)
+    if extension in ('.xlsx', '.xlsm'):
+        return _read_xlsx(path)
+    raise MarkImportError(f"Unsupported file type: {extension or path}")
+
+
+def count_rows(path):
+    # Only used to size the progress bar, so an estimate is good enough
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.csv':
+        with open(path, 'rb') as f:
+            return max(sum(1 for _ in f) - 1, 0)
+    try:
+        import openpyxl
+    except ImportError:
+        return 0
+    workbook = openpyxl.load_workbook(path, read_only=True)
+    try:
+        return max((workbook.active.max_row or 1) - 1, 0)
+    finally:
+        workbook.close()
+
+
+def validate_mark(column, value):
+    try:
+        mark = int(value)
+    except ValueError:
+        raise MarkImportError(f"{column} is not a whole number: {value!r}")
+    if not 0 <= mark <= 100:
+        raise MarkImportError(f"{column} must be between 0 and 100: {mark}")
+    return mark
+
+
+def validate_row(values):
+    record = dict(zip(COLUMNS, values))
+    for column in COLUMNS:
+        if not record[column]:
+            raise MarkImportError(f"{column} is empty")
+
+    for column in MARK_COLUMNS:
+        record[column] = validate_mark(column, record[column])
+
+    gender = GENDERS.get(record['gender'].lower())
+    if gender is None:
+        raise MarkImportError(f"gender must be Male or Female: {record['gender']!r}")
+    record['gender'] = gender
+
+    return tuple(record[column] for column in COLUMNS)
+
+
+def validate_chunk(chunk):
+    valid = []
+    errors = []
+    for line_number, values in chunk:
+        try:
+            valid.append(validate_row(values))
+        except MarkImportError as e:
+            errors.append(f"Row {line_number}: {e}")
+    return valid, errors
+
+
+def _chunks(rows, chunk_size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def import_marks(db, path, chunk_size=CHUNK_SIZE, progress=None):
+    # The whole file is loaded in a single transaction: either every valid
+    # row is committed or, if anything fails part way, none of them are
+    errors = []
+    imported = 0
+    rejected = 0
+    processed = 0
+    modules = set()
+
+    with db.transaction() as cursor:
+        for chunk in _chunks(read_rows(path), chunk_size):
+            valid, chunk_errors = validate_chunk(chunk)
+            modules.update(insert_marks(cursor, valid))
+            imported += len(valid)
+            rejected += len(chunk_errors)
+            errors.extend(chunk_errors[:MAX_REPORTED_ERRORS - len(errors)])
+            processed += len(chunk)
+            if progress:
+                progress(processed)
+
+    db.invalidate(modules)
+    return ImportResult(imported, rejected, errors)
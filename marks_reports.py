@@ -0,0 +1,124 @@
+import csv
+import multiprocessing
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from marks_db import GRADE_BANDS, MarksDatabase
+
+# End-of-term chart packs: every module is rendered in its own worker
+# process with the Agg backend, so rendering scales across cores instead of
+# being limited to the one Tk thread
+
+FORMATS = ('png', 'pdf')
+
+
+def safe_filename(module_code):
+    return re.sub(r'[^\w.-]+', '_', module_code).strip('_') or 'module'
+
+
+def _init_worker():
+    import matplotlib
+    matplotlib.use('Agg')
+
+
+def _grade_rows(aggregates):
+    count = aggregates['count']
+    for grade, _ in GRADE_BANDS:
+        students = aggregates['grades'][grade]
+        yield grade, students, round(100.0 * students / count, 1) if count else 0.0
+
+
+def _write_grade_table(path, module_code, aggregates):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(('module_code', 'grade', 'students', 'percent'))
+        for row in _grade_rows(aggregates):
+            writer.writerow((module_code, *row))
+
+
+def _grade_table_page(figure, module_code, aggregates):
+    figure.clear()
+    ax = figure.add_subplot(111)
+    ax.axis('off')
+    ax.set_title(f"{module_code}: {aggregates['count']} students, "
+                 f"average {aggregates['mean']:.1f}, "
+                 f"range {aggregates['min']}-{aggregates['max']}")
+    table = ax.table(cellText=[[grade, students, f'{percent}%']
+                               for grade, students, percent in _grade_rows(aggregates)],
+                     colLabels=('Grade', 'Students', 'Percent'), loc='center')
+    table.scale(1, 2)
+
+
+def render_module(db_path, module_code, output_dir, formats=FORMATS, graph_types=None):
+    # Runs in a worker process: it opens its own connection and figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.backends.backend_pdf import PdfPages
+    from charts import GRAPH_TYPES, ModuleChart
+
+    graph_types = graph_types or GRAPH_TYPES
+    db = MarksDatabase(db_path)
+    try:
+        data = db.chart_data(module_code)
+    finally:
+        db.close()
+    if not data:
+        return module_code, []
+
+    name = safe_filename(module_code)
+    written = []
+
+    grades_path = os.path.join(output_dir, f'{name}_grades.csv')
+    _write_grade_table(grades_path, module_code, data['aggregates'])
+    written.append(grades_path)
+
+    chart = ModuleChart()
+    FigureCanvasAgg(chart.figure)
+    chart.set_data(data)
+
+    if 'png' in formats:
+        for graph_type in graph_types:
+            chart.show(graph_type)
+            path = os.path.join(output_dir, f'{name}_{graph_type}.png')
+            chart.figure.savefig(path)
+            written.append(path)
+
+    if 'pdf' in formats:
+        # One PDF per module: a page per chart type plus the grade table
+        path = os.path.join(output_dir, f'{name}.pdf')
+        with PdfPages(path) as pdf:
+            for graph_type in graph_types:
+                chart.show(graph_type)
+                pdf.savefig(chart.figure)
+            _grade_table_page(chart.figure, module_code, data['aggregates'])
+            pdf.savefig(chart.figure)
+        written.append(path)
+
+    return module_code, written
+
+
+def generate_reports(db_path, output_dir, modules=None, formats=FORMATS,
+                     graph_types=None, workers=None, progress=None):
+    os.makedirs(output_dir, exist_ok=True)
+
+    if not modules:
+        db = MarksDatabase(db_path)
+        try:
+            modules = db.module_codes()
+        finally:
+            db.close()
+
+    # spawn rather than fork: a forked child would inherit the parent's open
+    # SQLite file handles and locks, which SQLite does not support
+    results = {}
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             mp_context=multiprocessing.get_context('spawn')) as executor:
+        futures = [executor.submit(render_module, db_path, module_code, output_dir,
+                                   formats, graph_types)
+                   for module_code in modules]
+        for done, future in enumerate(as_completed(futures), start=1):
+            module_code, written = future.result()
+            results[module_code] = written
+            if progress:
+                progress(done, len(futures), module_code)
+    return results
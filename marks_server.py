@@ -0,0 +1,177 @@
+import argparse
+import ipaddress
+import json
+import logging
+import sqlite3
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+from group_commit import GroupCommitWriter
+from marks_db import DB_PATH, MarksDatabase
+
+# One process owns marks.db and every copy of the app talks to it over
+# HTTP/JSON instead of locking the file on a shared drive:
+#
+#   python marks_server.py --db marks.db --host 0.0.0.0 --port 8765 --token s3cret
+#   "Mark Registration System.exe" --server http://marks-host:8765 --token s3cret
+#
+# Reads run on a fixed pool of handler threads, each with its own SQLite
+# connection. Writes from all clients are queued to a single writer thread
+# that commits whatever has arrived together in one transaction (group
+# commit), so concurrent marking sessions share fsyncs instead of queueing
+# on the file lock.
+
+log = logging.getLogger("marks.server")
+
+DEFAULT_PORT = 8765
+API_PREFIX = '/api/'
+
+# MarksDatabase methods clients may call, by kind
+READ_METHODS = frozenset((
+    'marks_for_module', 'marks_page_for_module', 'count_marks_for_module',
+    'marks_for_student', 'search', 'module_codes', 'module_totals',
+    'module_aggregates', 'module_summaries', 'chart_data',
+))
+WRITE_METHODS = frozenset((
+    'save_program_info', 'insert_mark', 'insert_marks_many', 'update_mark', 'update_marks_many',
+    'delete_marks',
+))
+
+
+class MarksRequestHandler(BaseHTTPRequestHandler):
+    server_version = 'MarksServer/1.0'
+
+    def log_message(self, format, *args):
+        log.debug("%s %s", self.address_string(), format % args)
+
+    def _reply(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _authorised(self):
+        token = self.server.token
+        if token and self.headers.get('X-Marks-Token') != token:
+            self._reply(403, {'error': "Invalid or missing token"})
+            return False
+        return True
+
+    def do_GET(self):
+        if not self._authorised():
+            return
+        if self.path == API_PREFIX + 'status':
+            writer = self.server.writer
+            self._reply(200, {'result': {
+                'schema_version': self.server.db.schema_version(),
+                'write_batches': writer.batches,
+                'writes': writer.writes,
+            }})
+        else:
+            self._reply(404, {'error': f"Unknown path: {self.path}"})
+
+    def do_POST(self):
+        if not self._authorised():
+            return
+        method = self.path[len(API_PREFIX):] if self.path.startswith(API_PREFIX) else None
+        if method not in READ_METHODS and method not in WRITE_METHODS:
+            self._reply(404, {'error': f"Unknown method: {method or self.path}"})
+            return
+
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            body = json.loads(self.rfile.read(length) or b'{}')
+            if not isinstance(body, dict):
+                raise ValueError("body must be a JSON object")
+            args = body.get('args', [])
+            if not isinstance(args, list):
+                raise ValueError("args must be a list")
+        except ValueError as e:
+            self._reply(400, {'error': f"Bad request: {e}"})
+            return
+
+        try:
+            if method in WRITE_METHODS:
+                result = self.server.writer.submit(method, args).result()
+            else:
+                result = getattr(self.server.db, method)(*args)
+        except (TypeError, ValueError, sqlite3.Error) as e:
+            self._reply(400, {'error': str(e), 'type': type(e).__name__})
+        except Exception as e:
+            log.exception("%s failed", method)
+            self._reply(500, {'error': str(e), 'type': type(e).__name__})
+        else:
+            self._reply(200, {'result': result})
+
+
+class MarksServer(HTTPServer):
+    # Requests are handled on a fixed pool of threads rather than a thread
+    # per request, so the number of SQLite connections stays bounded
+    def __init__(self, address, db, workers=8, token=None):
+        super().__init__(address, MarksRequestHandler)
+        self.db = db
+        self.token = token
+        self.writer = GroupCommitWriter(db)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='marks-reader')
+
+    def process_request(self, request, client_address):
+        self.executor.submit(self._process_request, request, client_address)
+
+    def _process_request(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self.executor.shutdown(wait=True)
+        self.writer.stop()
+
+
+def is_loopback(host):
+    if host == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='marks_server',
+                                     description="Serve a marks database to Mark Registration System clients")
+    parser.add_argument('--db', default=DB_PATH, help="database file (default: %(default)s)")
+    parser.add_argument('--host', default='127.0.0.1',
+                        help="address to listen on; use 0.0.0.0 (with --token) to accept "
+                             "other machines")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--workers', type=int, default=8, help="request handler threads")
+    parser.add_argument('--token', help="shared secret clients must send")
+    args = parser.parse_args(argv)
+    # Every write method is exposed, so other machines must present a token
+    if not args.token and not is_loopback(args.host):
+        parser.error(f"--token is required when listening on {args.host}")
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(message)s")
+    db = MarksDatabase(args.db)
+    db.migrate()
+    server = MarksServer((args.host, args.port), db, args.workers, args.token)
+    log.info("serving %s on http://%s:%d", args.db, args.host, server.server_port)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,141 @@
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+log = logging.getLogger("marks.profile")
+
+# Opt-in timing of UI actions, split into phases:
+#   query         - executing SQL (cursor.execute)
+#   fetch         - pulling rows off the cursor
+#   widget_update - filling the Treeview / form widgets
+#   render        - matplotlib drawing
+# Actions often hop threads (query on a worker, widgets on the Tk thread),
+# so an ActionTiming is created where the action starts and carried along.
+
+
+class ActionTiming:
+    def __init__(self, profiler, action):
+        self.profiler = profiler
+        self.action = action
+        self.started = time.perf_counter()
+        self.phases = {}
+        self.queries = []
+        self.total = None
+        self._lock = threading.Lock()
+
+    def add(self, phase, seconds):
+        with self._lock:
+            self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    @contextmanager
+    def active(self):
+        # Makes this the timing that SQL traces and profiler.phase() on the
+        # current thread are attributed to
+        previous = self.profiler.current()
+        self.profiler._local.timing = self
+        try:
+            yield self
+        finally:
+            self.profiler._local.timing = previous
+
+    @contextmanager
+    def phase(self, name):
+        with self.active():
+            started = time.perf_counter()
+            try:
+                yield
+            finally:
+                self.add(name, time.perf_counter() - started)
+
+    def wrap(self, fn, phase=None):
+        # For handing work to a TaskRunner worker thread. Reads leave phase
+        # unset so MarksDatabase splits them into query/fetch itself; writes
+        # are timed as a whole
+        def run(*args, **kwargs):
+            with (self.phase(phase) if phase else self.active()):
+                return fn(*args, **kwargs)
+        return run
+
+    def finish(self):
+        if self.total is None:
+            self.total = time.perf_counter() - self.started
+            self.profiler._record(self)
+
+
+class _NullTiming:
+    # Stand-in used while profiling is off, so call sites need no checks
+    phases = {}
+    queries = []
+
+    @contextmanager
+    def active(self):
+        yield self
+
+    @contextmanager
+    def phase(self, name):
+        yield
+
+    def wrap(self, fn, phase=None):
+        return fn
+
+    def finish(self):
+        pass
+
+
+NULL_TIMING = _NullTiming()
+
+
+class ActionProfiler:
+    def __init__(self, enabled=False, history=500):
+        self.enabled = enabled
+        self.history = deque(maxlen=history)
+        self.stats = {}
+        self.listeners = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def current(self):
+        return getattr(self._local, 'timing', None)
+
+    def start(self, action):
+        if not self.enabled:
+            return NULL_TIMING
+        return ActionTiming(self, action)
+
+    @contextmanager
+    def phase(self, name):
+        # Adds to whichever action is active on this thread, if any
+        timing = self.current()
+        if timing is None:
+            yield
+            return
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            timing.add(name, time.perf_counter() - started)
+
+    def trace(self, statement):
+        # sqlite3 trace callback: runs on the thread executing the statement
+        timing = self.current()
+        if timing is not None:
+            timing.queries.append(statement)
+        log.debug("sql %s", " ".join(statement.split()))
+
+    def _record(self, timing):
+        with self._lock:
+            self.history.append(timing)
+            stats = self.stats.setdefault(timing.action, {'count': 0, 'total': 0.0, 'max': 0.0})
+            stats['count'] += 1
+            stats['total'] += timing.total
+            stats['max'] = max(stats['max'], timing.total)
+            stats['last'] = timing
+
+        phases = " ".join(f"{name}={seconds * 1000:.1f}ms"
+                          for name, seconds in sorted(timing.phases.items()))
+        log.info("%s total=%.1fms %s queries=%d", timing.action, timing.total * 1000,
+                 phases, len(timing.queries))
+        for listener in list(self.listeners):
+            listener(timing)
@@ -0,0 +1,111 @@
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+
+
+class Task:
+    def __init__(self, future, on_done, on_error, key, interrupt=None):
+        self.future = future
+        self.on_done = on_done
+        self.on_error = on_error
+        self.key = key
+        # Stops the work if it is already running, e.g. by interrupting its
+        # query or making its import roll back. Tasks without one (writes)
+        # run to completion once started
+        self.interrupt = interrupt
+        self.cancelled = False
+
+    @property
+    def cancellable(self):
+        return self.interrupt is not None
+
+    def cancel(self):
+        # A task that has not started yet never runs; one that is already
+        # running is interrupted if it can be, and its result is dropped
+        self.cancelled = True
+        if not self.future.cancel() and self.interrupt:
+            self.interrupt()
+
+
+class TaskRunner:
+    POLL_MS = 30
+
+    def __init__(self, root, max_workers=2, on_busy=None):
+        self.root = root
+        self.on_busy = on_busy
+        self.executor = ThreadPoolExecutor(max_workers=max_workers,
+                                           thread_name_prefix="marks-worker")
+        self._tasks = []
+        self._polling = False
+
+    @property
+    def busy(self):
+        return any(not task.cancelled for task in self._tasks)
+
+    @property
+    def cancellable(self):
+        return any(not task.cancelled and task.cancellable for task in self._tasks)
+
+    def submit(self, fn, *args, on_done=None, on_error=None, key=None, interrupt=None):
+        return self.track(self.executor.submit(fn, *args), on_done=on_done,
+                          on_error=on_error, key=key, interrupt=interrupt)
+
+    def track(self, future, on_done=None, on_error=None, key=None, interrupt=None):
+        # Delivers any concurrent.futures.Future on the Tk thread, e.g. a
+        # coroutine handed to marks_async.EventLoopThread.submit. Only the
+        # most recent task per key is kept, so clicking View twice does not
+        # render the first (stale) result over the second
+        if key is not None:
+            self.cancel(key)
+
+        task = Task(future, on_done, on_error, key, interrupt)
+        self._tasks.append(task)
+        self._notify_busy()
+        if not self._polling:
+            self._polling = True
+            self.root.after(self.POLL_MS, self._poll)
+        return task
+
+    def cancel(self, key=None):
+        # Without a key this is the user's Cancel: only tasks that can
+        # really be stopped are cancelled, so a write that is committing
+        # still reports its result
+        for task in self._tasks:
+            selected = task.cancellable if key is None else task.key == key
+            if selected:
+                task.cancel()
+        self._notify_busy()
+
+    def shutdown(self):
+        # Reads, imports and exports are stopped, but writes - queued or
+        # already running - are waited for, so the database can be closed
+        # once this returns without losing them
+        self.cancel()
+        self.executor.shutdown(wait=True)
+
+    def _poll(self):
+        # Runs on the Tk thread, so callbacks are free to touch widgets
+        finished = [task for task in self._tasks if task.future.done()]
+        self._tasks = [task for task in self._tasks if not task.future.done()]
+
+        for task in finished:
+            if task.cancelled:
+                continue
+            try:
+                result = task.future.result()
+            except CancelledError:
+                continue
+            except Exception as e:
+                if task.on_error:
+                    task.on_error(e)
+                continue
+            if task.on_done:
+                task.on_done(result)
+
+        self._notify_busy()
+        if self._tasks:
+            self.root.after(self.POLL_MS, self._poll)
+        else:
+            self._polling = False
+
+    def _notify_busy(self):
+        if self.on_busy:
+            self.on_busy(self.busy)
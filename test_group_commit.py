@@ -0,0 +1,70 @@
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from group_commit import GroupCommitWriter
+from marks_db import MarksDatabase
+
+
+def mark_row(student_id, module_code='CS101', cw1=50):
+    return (module_code, 'Intro', cw1, 20, 10, student_id, f'Student {student_id}', 'Male',
+            '2024-01-01')
+
+
+class PeekingDatabase(MarksDatabase):
+    def insert_and_peek(self, row):
+        # Another thread reads, and caches, the module while the batch this
+        # write is part of has not committed yet
+        self.insert_marks_many([row])
+        with ThreadPoolExecutor(1) as pool:
+            return pool.submit(self.marks_for_module, row[0]).result()
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = PeekingDatabase(str(tmp_path / 'marks.db'))
+    db.migrate()
+    yield db
+    db.close()
+
+
+def test_queued_writes_share_commits(db):
+    writer = GroupCommitWriter(db, max_batch=50, max_delay=0.05)
+    futures = [writer.submit('insert_mark', mark_row(f'S{n}')) for n in range(100)]
+    writer.stop()
+
+    assert [future.result() for future in futures] == [1] * 100
+    assert writer.writes == 100 and writer.batches < 100
+    assert db.count_marks_for_module('CS101') == 100
+
+
+def test_cache_is_invalidated_once_the_batch_commits(db):
+    db.insert_mark(*mark_row('S1'))
+    assert len(db.marks_for_module('CS101')) == 1
+
+    writer = GroupCommitWriter(db, max_batch=10, max_delay=0.05)
+    peek = writer.submit('insert_and_peek', (mark_row('S2'),))
+    writer.stop()
+
+    # The uncommitted row was not visible to the reader...
+    assert len(peek.result()) == 1
+    # ...and what it cached then is not served afterwards
+    assert [row[0] for row in db.marks_for_module('CS101')] == ['S1', 'S2']
+
+
+def test_failed_write_rolls_back_alone(db):
+    writer = GroupCommitWriter(db, max_batch=10, max_delay=0.05)
+    before = writer.submit('insert_mark', mark_row('S1'))
+    # The first row is written before the second fails on its missing ID
+    failing = writer.submit('insert_marks_many', ([mark_row('S2', 'MA201'), mark_row(None, 'MA201')],))
+    after = writer.submit('insert_mark', mark_row('S3'))
+    writer.stop()
+
+    assert writer.batches == 1
+    assert before.result() == after.result() == 1
+    with pytest.raises(sqlite3.IntegrityError):
+        failing.result()
+    assert [row[0] for row in db.marks_for_module('CS101')] == ['S1', 'S3']
+    assert db.marks_for_module('MA201') == []
+    assert db.module_codes() == ['CS101']
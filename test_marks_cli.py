@@ -0,0 +1,63 @@
+import pytest
+
+from marks_cli import UPDATE_COLUMNS, main
+from marks_db import MarksDatabase
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / 'marks.db')
+    db = MarksDatabase(path)
+    db.migrate()
+    db.insert_marks_many([
+        ('CS101', 'Intro', 50, 20, 10, 'S1', 'Alice', 'Female', '2024-01-01'),
+        ('CS101', 'Intro', 30, 30, 30, 'S2', 'Ben', 'Male', '2024-01-02'),
+    ])
+    db.close()
+    return path
+
+
+def write_updates(tmp_path, lines):
+    path = tmp_path / 'updates.csv'
+    path.write_text('\n'.join([','.join(UPDATE_COLUMNS)] + lines) + '\n', encoding='utf-8')
+    return str(path)
+
+
+def marks(db_path, module_code='CS101'):
+    db = MarksDatabase(db_path)
+    try:
+        return db.marks_for_module(module_code)
+    finally:
+        db.close()
+
+
+def test_bulk_update_keeps_blank_dates(db_path, tmp_path, capsys):
+    updates = write_updates(tmp_path, ['S1,cs101,,70,25,0', 'S2,CS101,2024-02-01,0,0,0'])
+    assert main(['--db', db_path, 'bulk-update', updates]) == 0
+    assert 'Updated 2 rows, 0 matched no marks.' in capsys.readouterr().out
+    assert marks(db_path) == [('S1', 'Alice', 70, 25, 0), ('S2', 'Ben', 0, 0, 0)]
+
+    db = MarksDatabase(db_path)
+    assert [row[5] for row in db.marks_for_student('S1')] == ['2024-01-01']
+    db.close()
+
+
+def test_bulk_update_rejects_bad_marks(db_path, tmp_path, capsys):
+    updates = write_updates(tmp_path, ['S1,CS101,,70,25,0', 'S2,CS101,,150,0,0'])
+    assert main(['--db', db_path, 'bulk-update', updates]) == 1
+    assert 'Row 3: coursework_1_mark must be between 0 and 100: 150' in capsys.readouterr().err
+    # Nothing is applied
+    assert marks(db_path)[0] == ('S1', 'Alice', 50, 20, 10)
+
+
+@pytest.mark.parametrize('strict, status', ((False, 0), (True, 1)))
+def test_bulk_update_reports_unmatched_rows(db_path, tmp_path, capsys, strict, status):
+    updates = write_updates(tmp_path, ['S1,CS101,,70,25,0', 'S9,CS101,,10,10,10', 'S2,MA201,,1,1,1'])
+    args = ['--db', db_path, 'bulk-update', updates] + (['--strict'] if strict else [])
+    assert main(args) == status
+
+    output = capsys.readouterr()
+    assert 'Updated 1 rows, 2 matched no marks.' in output.out
+    assert 'Row 3: no marks for student S9 in CS101' in output.err
+    assert 'Row 4: no marks for student S2 in MA201' in output.err
+    assert marks(db_path)[0] == ('S1', 'Alice', 70, 25, 0)
@@ -0,0 +1,313 @@
+import random
+import sqlite3
+
+import pytest
+
+from marks_db import (MIGRATIONS, SCHEMA_VERSION, SUMMARY_STAT_COLUMNS, MarksDatabase,
+                      ModuleCache, _summary_aggregates)
+
+# Databases in every earlier layout are migrated to the current schema, and
+# the tables triggers maintain are compared with what a fresh query over
+# marks gives after random writes
+
+FLAT_COLUMNS = ('module_code', 'module_name', 'coursework_1_mark', 'coursework_2_mark',
+                'coursework_3_mark', 'student_id', 'student_name', 'gender', 'date_of_entry')
+
+# The original app's schema, before the migrations existed
+FLAT_SCHEMA = '''
+CREATE TABLE marks (
+    id INTEGER PRIMARY KEY,
+    module_code TEXT,
+    module_name TEXT,
+    coursework_1_mark INTEGER,
+    coursework_2_mark INTEGER,
+    coursework_3_mark INTEGER,
+    student_id TEXT,
+    student_name TEXT,
+    gender TEXT,
+    date_of_entry TEXT
+)
+'''
+
+# Before it used MarksDatabase, "Mark Registration System.py" keyed marks on
+# student_id
+STUDENT_KEYED_SCHEMA = '''
+CREATE TABLE marks (
+    student_id TEXT PRIMARY KEY,
+    student_name TEXT,
+    module_code TEXT,
+    module_name TEXT,
+    date_of_entry TEXT,
+    coursework_1_mark INTEGER,
+    coursework_2_mark INTEGER,
+    coursework_3_mark INTEGER,
+    gender TEXT
+)
+'''
+
+FLAT_ROWS = [
+    ('CS101', 'Intro', 50, 20, 10, 'S1', 'Alice', 'Female', '2024-01-01'),
+    ('CS101', 'Intro', 30, 30, 30, 'S2', 'Ben', 'Male', '22 JN 13'),
+    # Same student and module again: the later entry wins
+    ('CS101', 'Intro', 70, 25, 5, 'S1', 'Alice', 'Female', '2024-02-01'),
+    # Module codes were always matched case-insensitively
+    ('cs101', 'Intro to CS', 10, None, 0, 'S3', 'Chloe', 'Female', '2024-01-03'),
+    ('MA201', 'Algebra', 40, 30, 30, 'S1', 'Alice', 'Female', '2024-01-04'),
+    ('MA201', 'Algebra', None, None, None, 'S4', 'Dev', 'Male', '2024-01-05'),
+]
+
+
+def flat_database(path, schema=FLAT_SCHEMA, rows=FLAT_ROWS, version=0):
+    # The rows are entered into the flat table, then the database is brought
+    # up to the given schema version as an older release would have left it
+    conn = sqlite3.connect(path)
+    conn.execute(schema)
+    conn.executemany(f"INSERT INTO marks ({', '.join(FLAT_COLUMNS)}) "
+                     f"VALUES ({', '.join('?' * len(FLAT_COLUMNS))})", rows)
+    cursor = conn.cursor()
+    for migration in MIGRATIONS[:version]:
+        migration(cursor)
+    cursor.execute(f"PRAGMA user_version = {version}")
+    conn.commit()
+    conn.close()
+
+
+def migrated(path):
+    db = MarksDatabase(path)
+    db.migrate()
+    return db
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = migrated(str(tmp_path / 'marks.db'))
+    yield db
+    db.close()
+
+
+def test_new_database_is_current(db):
+    assert db.schema_version() == SCHEMA_VERSION
+    assert db.module_codes() == []
+
+
+def test_migrate_student_keyed_database(tmp_path):
+    path = str(tmp_path / 'keyed.db')
+    flat_database(path, STUDENT_KEYED_SCHEMA, [row for row in FLAT_ROWS if row[5] != 'S1'])
+    db = migrated(path)
+
+    assert db.schema_version() == SCHEMA_VERSION
+    assert db.count_marks_for_module('CS101') == 2
+    assert db.count_marks_for_module('MA201') == 1
+    db.close()
+
+
+def test_migrate_from_version_3(tmp_path):
+    path = str(tmp_path / 'v3.db')
+    flat_database(path, version=3)
+    db = migrated(path)
+
+    assert db.schema_version() == SCHEMA_VERSION
+    assert db.count_marks_for_module('CS101') == 3
+    assert db.count_marks_for_module('MA201') == 2
+    db.close()
+
+
+def test_migrate_is_idempotent(tmp_path):
+    path = str(tmp_path / 'flat.db')
+    flat_database(path)
+    for _ in range(2):
+        db = migrated(path)
+        assert db.schema_version() == SCHEMA_VERSION
+        assert db.count_marks_for_module('MA201') == 2
+        db.close()
+
+
+def test_migrate_flat_database_normalizes(tmp_path):
+    path = str(tmp_path / 'flat.db')
+    flat_database(path)
+    db = migrated(path)
+
+    # Each student and module is stored once; the latest details win
+    assert db.conn.execute("SELECT student_id, student_name FROM students ORDER BY student_id").fetchall() == \
+        [('S1', 'Alice'), ('S2', 'Ben'), ('S3', 'Chloe'), ('S4', 'Dev')]
+    assert db.conn.execute("SELECT module_code, module_name FROM modules ORDER BY id").fetchall() == \
+        [('cs101', 'Intro to CS'), ('MA201', 'Algebra')]
+    assert [column for column in ('module_code', 'student_name')
+            if column in [info[1] for info in db.conn.execute("PRAGMA table_info(marks)")]] == []
+    assert db.marks_for_module('CS101') == [('S2', 'Ben', 30, 30, 30), ('S1', 'Alice', 70, 25, 5),
+                                            ('S3', 'Chloe', 10, None, 0)]
+    db.close()
+
+
+def test_migrate_flat_database_reclaims_space(tmp_path):
+    path = str(tmp_path / 'flat.db')
+    flat_database(path, rows=[(f'CS{n % 20}', 'Module', n % 100, 1, 2, f'S{n}', f'Student {n}',
+                               'Male', '2024-01-01') for n in range(200)])
+    db = migrated(path)
+    # The pages of the rebuilt tables are not left on the freelist
+    assert db.conn.execute("PRAGMA freelist_count").fetchone()[0] == 0
+    db.close()
+
+
+def assert_summary_current(db):
+    stored = db.conn.execute(
+        f"SELECT module_ref, {SUMMARY_STAT_COLUMNS} FROM module_summary ORDER BY module_ref").fetchall()
+    fresh = db.conn.execute(
+        f"SELECT module_ref, {_summary_aggregates()} FROM marks GROUP BY module_ref "
+        f"ORDER BY module_ref").fetchall()
+    assert stored == fresh
+
+
+def random_writes(db, seed, rounds=300):
+    rng = random.Random(seed)
+    students = [f'S{n}' for n in range(1, 25)]
+    modules = ['CS101', 'MA201', 'PH301', 'EN102']
+
+    def mark():
+        return rng.choice((None, rng.randint(0, 100), rng.randint(0, 40)))
+
+    for _ in range(rounds):
+        action = rng.random()
+        if action < 0.5:
+            # Renames come through re-entering a student or module
+            rows = [(rng.choice(modules), rng.choice(('Name A', 'Name B')), mark(), mark(), mark(),
+                     rng.choice(students), rng.choice(('Alice', 'Alicia', 'Ben')),
+                     rng.choice(('Male', 'Female')), '2024-03-01')
+                    for _ in range(rng.randint(1, 5))]
+            db.insert_marks_many(rows)
+        elif action < 0.8:
+            db.update_marks_many([(rng.choice(students), rng.choice(modules), None,
+                                   mark(), mark(), mark()) for _ in range(rng.randint(1, 5))])
+        else:
+            db.delete_marks([(rng.choice(students), rng.choice(modules))
+                             for _ in range(rng.randint(1, 3))])
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_summary_tracks_random_writes(db, seed):
+    random_writes(db, seed)
+    assert_summary_current(db)
+
+
+@pytest.mark.parametrize('version', (0, 3))
+def test_migrated_summary_tracks_random_writes(tmp_path, version):
+    path = str(tmp_path / 'flat.db')
+    flat_database(path, version=version)
+    db = migrated(path)
+    assert_summary_current(db)
+    aggregates = db.module_aggregates('CS101')
+    assert aggregates['count'] == 3
+    assert (aggregates['min'], aggregates['max']) == (10, 100)
+
+    random_writes(db, 10 + version)
+    assert_summary_current(db)
+    db.close()
+
+
+def test_cache_invalidates_by_module():
+    cache = ModuleCache()
+    cs101 = cache.get_or_load('CS101', ('q',), lambda: ['cs101 rows'])
+    ma201 = cache.get_or_load('MA201', ('q',), lambda: ['ma201 rows'])
+    assert cache.get_or_load('cs101', ('q',), list) is cs101
+
+    cache.invalidate(['cs101'])
+    assert cache.get_or_load('CS101', ('q',), lambda: ['new rows']) == ['new rows']
+    assert cache.get_or_load('MA201', ('q',), list) is ma201
+
+
+def test_cache_sees_own_writes(db):
+    db.insert_mark('CS101', 'Intro', 50, 20, 10, 'S1', 'Alice', 'Female', '2024-01-01')
+    assert db.marks_for_module('CS101') == [('S1', 'Alice', 50, 20, 10)]
+    db.update_mark('S1', 'CS101', None, 60, 20, 10)
+    assert db.marks_for_module('cs101') == [('S1', 'Alice', 60, 20, 10)]
+    db.delete_marks([('S1', 'CS101')])
+    assert db.marks_for_module('CS101') == []
+
+
+def test_cache_sees_writes_from_another_connection(tmp_path):
+    path = str(tmp_path / 'marks.db')
+    first, second = migrated(path), MarksDatabase(path)
+    first.insert_mark('CS101', 'Intro', 50, 20, 10, 'S1', 'Alice', 'Female', '2024-01-01')
+    assert first.marks_for_module('CS101') == [('S1', 'Alice', 50, 20, 10)]
+
+    second.update_mark('S1', 'CS101', None, 60, 20, 10)
+    assert first.marks_for_module('CS101') == [('S1', 'Alice', 60, 20, 10)]
+
+    # Plain sqlite3, as another tool would write
+    conn = sqlite3.connect(path)
+    conn.execute("UPDATE marks SET coursework_1_mark = 70")
+    conn.commit()
+    conn.close()
+    assert first.module_aggregates('CS101')['sum'] == 100
+    first.close()
+    second.close()
+
+
+@pytest.mark.parametrize('module_codes', (['CS101'], None))
+def test_cache_drops_results_loaded_during_a_write(module_codes):
+    cache = ModuleCache()
+    loads = []
+
+    def stale_load():
+        # A write lands while the query is running
+        loads.append('stale')
+        cache.invalidate(module_codes)
+        return 'stale'
+
+    assert cache.get_or_load('CS101', ('q',), stale_load) == 'stale'
+    assert cache.get_or_load('CS101', ('q',), lambda: 'fresh') == 'fresh'
+    assert cache.get_or_load('cs101', ('q',), stale_load) == 'fresh'
+    assert loads == ['stale']
+
+
+def test_migrate_sets_duplicate_entries_aside(tmp_path):
+    path = str(tmp_path / 'flat.db')
+    flat_database(path)
+    db = migrated(path)
+
+    # One row per student and module: the latest entry is kept and the
+    # older one is moved to marks_duplicates with the id of the kept row
+    assert db.count_marks_for_module('CS101') == 3
+    assert dict((row[0], row[2:]) for row in db.marks_for_module('cs101'))['S1'] == (70, 25, 5)
+    assert db.conn.execute("SELECT id, coursework_1_mark, kept_id FROM marks_duplicates").fetchall() == \
+        [(1, 50, 3)]
+    assert_summary_current(db)
+
+    db.insert_mark('CS101', 'Intro', 80, 10, 5, 'S1', 'Alice', 'Female', '2024-03-01')
+    assert db.count_marks_for_module('CS101') == 3
+    assert db.update_mark('S1', 'CS101', None, 90, 10, 0) == 1
+    assert db.delete_marks([('S1', 'cs101')]) == 1
+    assert db.count_marks_for_module('CS101') == 2
+    assert_summary_current(db)
+    db.close()
+
+
+def assert_search_current(db):
+    # With rank 1 the check also compares the index with marks_search_source
+    db.conn.execute("INSERT INTO marks_search (marks_search, rank) VALUES ('integrity-check', 1)")
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_search_index_tracks_random_writes(db, seed):
+    random_writes(db, seed)
+    assert_search_current(db)
+
+
+@pytest.mark.parametrize('version', (0, 6))
+def test_migrated_search_index(tmp_path, version):
+    path = str(tmp_path / 'flat.db')
+    flat_database(path, version=version)
+    db = migrated(path)
+    assert_search_current(db)
+    assert [row[1] for row in db.search('chl')] == ['S3']
+    assert [(row[1], row[3]) for row in db.search('alg ali')] == [('S1', 'MA201')]
+
+    # Names and codes are read from the normalized tables, not stored again
+    tables = [name for name, in db.conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+    assert 'marks_search_content' not in tables
+
+    db.insert_mark('MA201', 'Linear Maths', 50, 50, 0, 'S1', 'Alicia', 'Female', '2024-03-01')
+    assert [row[1] for row in db.search('alici linear')] == ['S1']
+    assert db.search('alg ali') == []
+    assert_search_current(db)
+    db.close()
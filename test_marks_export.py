@@ -0,0 +1,69 @@
+import csv
+
+import pytest
+
+from marks_db import EXPORT_COLUMNS, MarksDatabase
+from marks_export import MarkExportError, export_marks
+
+ENTRIES = [
+    ('CS101', 'Intro', 50, 20, 10, 'S1', 'Alice', 'Female', '2024-01-31'),
+    ('CS101', 'Intro', 30, 30, 30, 'S2', 'Ben', 'Male', '2024-02-01'),
+    # Free text from the form: never inside a date range
+    ('CS101', 'Intro', 10, 0, 0, 'S3', 'Chloe', 'Female', '22 JN 13'),
+    # Would sort inside the range if compared as text
+    ('CS101', 'Intro', 40, 0, 0, 'S4', 'Dev', 'Male', '2024-02-01 late'),
+    ('MA201', 'Algebra', 40, 30, 30, 'S1', 'Alice', 'Female', '2024-02-15'),
+]
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = MarksDatabase(str(tmp_path / 'marks.db'))
+    db.migrate()
+    db.insert_marks_many(ENTRIES)
+    yield db
+    db.close()
+
+
+def read_csv(path):
+    with open(path, newline='', encoding='utf-8') as f:
+        return list(csv.reader(f))
+
+
+def test_export_everything(db, tmp_path):
+    path = str(tmp_path / 'marks.csv')
+    assert export_marks(db, path) == (5, 0)
+    rows = read_csv(path)
+    assert tuple(rows[0]) == EXPORT_COLUMNS
+    assert [row[2] for row in rows[1:]] == ['S1', 'S2', 'S3', 'S4', 'S1']
+
+
+@pytest.mark.parametrize('date_from, date_to, module_code, students, skipped', (
+    ('2024-02-01', None, None, ['S2', 'S1'], 2),
+    (None, '2024-01-31', None, ['S1'], 2),
+    ('2024-02-01', '2024-02-01', 'CS101', ['S2'], 2),
+    ('2024-01-01', '2024-12-31', 'MA201', ['S1'], 0),
+))
+def test_export_date_filter(db, tmp_path, date_from, date_to, module_code, students, skipped):
+    path = str(tmp_path / 'marks.csv')
+    result = export_marks(db, path, module_code=module_code, date_from=date_from, date_to=date_to)
+    assert [row[2] for row in read_csv(path)[1:]] == students
+    assert result == (len(students), skipped)
+
+
+def test_export_rejects_bad_dates(db, tmp_path):
+    path = tmp_path / 'marks.csv'
+    with pytest.raises(MarkExportError, match='YYYY-MM-DD'):
+        export_marks(db, str(path), date_from='01/02/2024')
+    assert not path.exists()
+
+
+def test_cancelled_export_leaves_no_file(db, tmp_path):
+    path = tmp_path / 'marks.csv'
+
+    def progress(written):
+        raise MarkExportError("Export cancelled")
+
+    with pytest.raises(MarkExportError):
+        export_marks(db, str(path), batch_size=2, progress=progress)
+    assert not path.exists()
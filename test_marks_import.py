@@ -0,0 +1,68 @@
+import csv
+
+import pytest
+
+from marks_db import MarksDatabase
+from marks_import import COLUMNS, MarkImportError, import_marks
+
+
+def write_csv(path, rows, header=COLUMNS):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(rows)
+    return str(path)
+
+
+def import_rows(count, module_code='CS101'):
+    return [(module_code, 'Intro', n % 101, 0, 5, f'S{n}', f'Student {n}', 'female', '2024-01-01')
+            for n in range(count)]
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = MarksDatabase(str(tmp_path / 'marks.db'))
+    db.migrate()
+    yield db
+    db.close()
+
+
+def test_import_rejects_invalid_rows(db, tmp_path):
+    rows = import_rows(3) + [
+        ('CS101', 'Intro', 101, 0, 5, 'S9', 'Too High', 'Male', '2024-01-01'),
+        ('CS101', 'Intro', 'ten', 0, 5, 'S10', 'Not A Number', 'Male', '2024-01-01'),
+        ('CS101', 'Intro', 10, 0, 5, '', 'No ID', 'Male', '2024-01-01'),
+    ]
+    result = import_marks(db, write_csv(tmp_path / 'marks.csv', rows))
+
+    assert (result.imported, result.rejected) == (3, 3)
+    assert result.errors == [
+        "Row 5: coursework_1_mark must be between 0 and 100: 101",
+        "Row 6: coursework_1_mark is not a whole number: 'ten'",
+        "Row 7: student_id is empty",
+    ]
+    assert [row[0] for row in db.marks_for_module('CS101')] == ['S0', 'S1', 'S2']
+
+
+def test_import_requires_every_column(db, tmp_path):
+    path = write_csv(tmp_path / 'marks.csv', [row[1:] for row in import_rows(2)], COLUMNS[1:])
+    with pytest.raises(MarkImportError, match='Missing columns: module_code'):
+        import_marks(db, path)
+
+
+def test_failed_import_rolls_back(db, tmp_path):
+    db.insert_mark('CS101', 'Intro', 1, 2, 3, 'S0', 'Kept', 'Male', '2023-01-01')
+    assert len(db.marks_for_module('CS101')) == 1
+    path = write_csv(tmp_path / 'marks.csv', import_rows(250))
+
+    def progress(processed):
+        # As the app's Cancel does, part way through the file
+        if processed >= 200:
+            raise MarkImportError("Import cancelled")
+
+    with pytest.raises(MarkImportError):
+        import_marks(db, path, chunk_size=100, progress=progress)
+
+    # Not even the chunks that went in before the failure are kept
+    assert db.marks_for_module('CS101') == [('S0', 'Kept', 1, 2, 3)]
+    assert db.module_aggregates('CS101')['count'] == 1
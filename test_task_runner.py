@@ -0,0 +1,35 @@
+import threading
+
+from task_runner import TaskRunner
+
+
+class FakeRoot:
+    # Callbacks are not delivered; only the futures are looked at
+    def after(self, ms, callback):
+        pass
+
+
+def test_shutdown_stops_reads_and_finishes_writes():
+    runner = TaskRunner(FakeRoot(), max_workers=1)
+    started, release, interrupted = threading.Event(), threading.Event(), threading.Event()
+    written = []
+
+    def running_read():
+        started.set()
+        release.wait(5)
+        return 'read'
+
+    def interrupt():
+        interrupted.set()
+        release.set()
+
+    read = runner.submit(running_read, interrupt=interrupt)
+    started.wait(5)
+    writes = [runner.submit(written.append, n) for n in range(3)]
+    queued_read = runner.submit(lambda: 'never', interrupt=lambda: None)
+
+    runner.shutdown()
+    assert interrupted.is_set() and read.cancelled
+    assert queued_read.future.cancelled()
+    assert written == [0, 1, 2]
+    assert all(write.future.done() and not write.cancelled for write in writes)